@@ -0,0 +1,327 @@
+"""
+Fake database and datafeed shared by tests, no external service required.
+"""
+
+from copy import copy
+from datetime import datetime, timedelta
+from threading import Lock
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import vnpy.trader.database
+import vnpy.trader.datafeed
+from vnpy.event import EventEngine
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ, BarOverview
+from vnpy.trader.object import BarData, TickData
+
+import vnpy_ctastrategy.backtesting as backtesting
+import vnpy_ctastrategy.history as history
+import vnpy_ctastrategy.optimization as optimization
+import vnpy_ctastrategy.persistence as persistence
+
+
+def to_db_time(dt: datetime) -> datetime:
+    """
+    Convert datetime into naive DB_TZ time, naive one is already DB_TZ time.
+    """
+    if not dt.tzinfo:
+        return dt
+    return dt.astimezone(DB_TZ).replace(tzinfo=None)
+
+
+class FakeDatabase:
+    """
+    In-memory database with the same datetime handling as vnpy_sqlite.
+    """
+
+    def __init__(self):
+        """"""
+        self.bars = {}      # (symbol, exchange, interval): {datetime: bar}
+        self.ticks = {}     # (symbol, exchange): {datetime: tick}
+        self.queries = []
+
+    def save_bar_data(self, bars: list) -> bool:
+        """"""
+        for bar in bars:
+            key = (bar.symbol, bar.exchange, bar.interval)
+            bar = copy(bar)
+            bar.datetime = to_db_time(bar.datetime)
+            self.bars.setdefault(key, {})[bar.datetime] = bar
+        return True
+
+    def save_tick_data(self, ticks: list) -> bool:
+        """"""
+        for tick in ticks:
+            key = (tick.symbol, tick.exchange)
+            tick = copy(tick)
+            tick.datetime = to_db_time(tick.datetime)
+            self.ticks.setdefault(key, {})[tick.datetime] = tick
+        return True
+
+    def load_bar_data(self, symbol, exchange, interval, start, end) -> list:
+        """"""
+        self.queries.append(("bar", start, end))
+        data = self.bars.get((symbol, exchange, interval), {})
+        return self.select(data, start, end)
+
+    def load_tick_data(self, symbol, exchange, start, end) -> list:
+        """"""
+        self.queries.append(("tick", start, end))
+        data = self.ticks.get((symbol, exchange), {})
+        return self.select(data, start, end)
+
+    def select(self, data: dict, start: datetime, end: datetime) -> list:
+        """"""
+        start = to_db_time(start)
+        end = to_db_time(end)
+
+        result = []
+        for dt in sorted(data.keys()):
+            if start <= dt <= end:
+                item = copy(data[dt])
+                item.datetime = DB_TZ.localize(dt)
+                result.append(item)
+        return result
+
+    def get_bar_overview(self) -> list:
+        """"""
+        overviews = []
+        for (symbol, exchange, interval), data in self.bars.items():
+            if not data:
+                continue
+
+            overviews.append(BarOverview(
+                symbol=symbol,
+                exchange=exchange,
+                interval=interval,
+                count=len(data),
+                start=min(data.keys()),
+                end=max(data.keys())
+            ))
+        return overviews
+
+
+class FakeDatafeed:
+    """
+    Datafeed of minute bars generated up to current time, the last bar of
+    which is still forming.
+    """
+
+    def __init__(self, naive: bool = False):
+        """"""
+        self.naive = naive
+        self.version = 0        # changed to simulate update of forming bar
+        self.requests = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = Lock()
+
+    def init(self) -> bool:
+        """"""
+        return True
+
+    def query_bar_history(self, req) -> list:
+        """"""
+        with self.lock:
+            self.requests.append(req)
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+
+        try:
+            now = datetime.now(DB_TZ)
+            end = min(req.end.astimezone(DB_TZ), now)
+            dt = req.start.astimezone(DB_TZ).replace(second=0, microsecond=0)
+            if dt < req.start.astimezone(DB_TZ):
+                dt += timedelta(minutes=1)
+
+            bars = []
+            while dt <= end:
+                forming = dt + timedelta(minutes=1) > now
+                price = dt.timestamp() / 60 % 1000 + 1000
+
+                bar = BarData(
+                    symbol=req.symbol,
+                    exchange=req.exchange,
+                    datetime=dt.astimezone().replace(tzinfo=None) if self.naive else dt,
+                    interval=req.interval,
+                    volume=self.version if forming else 1,
+                    open_price=price,
+                    high_price=price,
+                    low_price=price,
+                    close_price=price,
+                    gateway_name="DATAFEED"
+                )
+                bars.append(bar)
+                dt += timedelta(minutes=1)
+
+            return bars
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def generate_bars(
+    symbol: str = "rb",
+    exchange: Exchange = Exchange.SHFE,
+    start: datetime = datetime(2022, 1, 3, 9),
+    days: int = 20,
+    minutes: int = 240,
+    seed: int = 7
+) -> list:
+    """
+    Generate minute bars of random walk price.
+    """
+    rng = np.random.default_rng(seed)
+    price = 4000.0
+    bars = []
+
+    for d in range(days):
+        day = start + timedelta(days=d)
+
+        for m in range(minutes):
+            open_price = price
+            price = round(open_price + rng.normal(0, 3), 0)
+
+            bar = BarData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=DB_TZ.localize(day + timedelta(minutes=m)),
+                interval=Interval.MINUTE,
+                volume=float(rng.integers(1, 100)),
+                turnover=0,
+                open_interest=1000,
+                open_price=open_price,
+                high_price=max(open_price, price) + abs(round(rng.normal(0, 2))),
+                low_price=min(open_price, price) - abs(round(rng.normal(0, 2))),
+                close_price=price,
+                gateway_name="DB"
+            )
+            bars.append(bar)
+
+    return bars
+
+
+def generate_ticks(
+    symbol: str = "rb",
+    exchange: Exchange = Exchange.SHFE,
+    start: datetime = datetime(2022, 1, 3, 9),
+    days: int = 3,
+    seconds: int = 3600,
+    seed: int = 7
+) -> list:
+    """
+    Generate ticks of random walk price every 2 seconds.
+    """
+    rng = np.random.default_rng(seed)
+    price = 4000.0
+    ticks = []
+
+    for d in range(days):
+        day = start + timedelta(days=d)
+
+        for s in range(0, seconds, 2):
+            price = round(price + rng.normal(0, 1), 0)
+
+            tick = TickData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=DB_TZ.localize(day + timedelta(seconds=s)),
+                name=symbol,
+                volume=s,
+                open_interest=1000,
+                last_price=price,
+                bid_price_1=price - 1,
+                ask_price_1=price + 1,
+                bid_volume_1=5,
+                ask_volume_1=5,
+                bid_price_5=price - 5,
+                ask_price_5=price + 5,
+                gateway_name="DB"
+            )
+            ticks.append(tick)
+
+    return ticks
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    """
+    Redirect files written into trader folder to temp folder.
+    """
+    def get_folder_path(folder_name: str):
+        path = tmp_path.joinpath(folder_name)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def get_file_path(filename: str):
+        return tmp_path.joinpath(filename)
+
+    for module in [backtesting, history, optimization]:
+        monkeypatch.setattr(module, "get_folder_path", get_folder_path)
+    monkeypatch.setattr(persistence, "get_file_path", get_file_path)
+
+    return tmp_path
+
+
+@pytest.fixture
+def database(monkeypatch, folder):
+    """
+    Fake database with generated bars and ticks.
+    """
+    db = FakeDatabase()
+    db.save_bar_data(generate_bars())
+    db.save_tick_data(generate_ticks())
+    db.queries.clear()
+
+    monkeypatch.setattr(vnpy.trader.database, "database", db)
+
+    # Data loaded by previous tests is cached by function
+    for func in [
+        backtesting.load_bar_data,
+        backtesting.load_tick_data,
+        backtesting.load_bar_array,
+        backtesting.load_tick_array
+    ]:
+        func.cache_clear()
+
+    yield db
+
+    for func in [
+        backtesting.load_bar_data,
+        backtesting.load_tick_data,
+        backtesting.load_bar_array,
+        backtesting.load_tick_array
+    ]:
+        func.cache_clear()
+
+
+@pytest.fixture
+def cta_engine(monkeypatch, folder):
+    """
+    CtaEngine with empty fake database and fake datafeed, events put are
+    recorded instead of processed.
+    """
+    import vnpy_ctastrategy.engine as engine_module
+
+    db = FakeDatabase()
+    datafeed = FakeDatafeed()
+
+    monkeypatch.setattr(vnpy.trader.database, "database", db)
+    monkeypatch.setattr(vnpy.trader.datafeed, "datafeed", datafeed)
+    monkeypatch.setattr(engine_module, "save_json", lambda filename, data: None)
+
+    main_engine = MagicMock()
+    main_engine.get_contract.return_value = None
+
+    engine = engine_module.CtaEngine(main_engine, EventEngine())
+
+    events = []
+    engine.event_engine.put = events.append
+    engine.events = events
+
+    yield engine
+
+    engine.init_executor.shutdown()
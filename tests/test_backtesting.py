@@ -0,0 +1,256 @@
+"""
+Tests of optional backtesting modes against the default mode.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from vnpy.trader.optimize import OptimizationSetting
+
+from vnpy_ctastrategy import CtaTemplate
+from vnpy_ctastrategy.backtesting import BacktestingEngine, DailyResult
+from vnpy_ctastrategy.strategies.double_ma_strategy import DoubleMaStrategy
+
+
+START = datetime(2022, 1, 3)
+END = datetime(2022, 1, 23)
+
+
+class DayStrategy(CtaTemplate):
+    """
+    Hold one lot only on trade_day of each month.
+    """
+
+    trade_day = 0
+
+    parameters = ["trade_day"]
+
+    def on_init(self):
+        """"""
+        self.load_bar(1)
+
+    def on_bar(self, bar):
+        """"""
+        if bar.datetime.day == self.trade_day:
+            if not self.pos:
+                self.buy(bar.close_price + 5, 1)
+        elif self.pos:
+            self.sell(bar.close_price - 5, self.pos)
+
+
+def create_engine(strategy_class: type, setting: dict = None, **kwargs) -> BacktestingEngine:
+    """
+    Create engine with strategy added for data in fake database.
+    """
+    parameters = {
+        "vt_symbol": "rb.SHFE",
+        "interval": "1m",
+        "start": START,
+        "end": END,
+        "rate": 0.0001,
+        "slippage": 1,
+        "size": 10,
+        "pricetick": 1,
+        "capital": 1_000_000,
+    }
+    parameters.update(kwargs)
+
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(**parameters)
+    engine.add_strategy(strategy_class, setting or {})
+    return engine
+
+
+def run_backtesting(strategy_class: type, setting: dict = None, **kwargs) -> dict:
+    """
+    Run backtesting and return trades, daily results and statistics.
+    """
+    engine = create_engine(strategy_class, setting, **kwargs)
+    engine.load_data()
+    engine.run_backtesting()
+    df = engine.calculate_result()
+
+    return {
+        "engine": engine,
+        "trades": get_trades(engine),
+        "df": df,
+        "statistics": engine.calculate_statistics(output=False),
+    }
+
+
+def get_trades(engine: BacktestingEngine) -> list:
+    """"""
+    return [
+        (t.tradeid, t.direction, t.offset, t.price, t.volume, t.datetime)
+        for t in engine.get_all_trades()
+    ]
+
+
+def assert_same_result(result: dict, base: dict) -> None:
+    """
+    Check trades, daily results and statistics are exactly the same.
+    """
+    assert result["trades"] == base["trades"]
+    assert result["trades"]
+
+    columns = [c for c in base["df"].columns if c != "trades"]
+    assert result["df"].index.equals(base["df"].index)
+    assert result["df"][columns].equals(base["df"][columns])
+
+    for key, value in base["statistics"].items():
+        assert result["statistics"][key] == value, key
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"columnar": True},
+    {"use_cache": True},
+    {"load_workers": 3},
+    {"streaming": True},
+    {"columnar": True, "precompute": True},
+])
+def test_backtesting_mode(database, kwargs):
+    """
+    Each optional mode gives exactly the same result as the default one.
+    """
+    base = run_backtesting(DoubleMaStrategy)
+
+    # Run twice so that data loaded from cache is also checked
+    for _ in range(2):
+        result = run_backtesting(DoubleMaStrategy, **kwargs)
+        assert_same_result(result, base)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_batch_backtesting(database, max_workers):
+    """
+    Strategies run in batch, with history data in shared memory or not,
+    give the same statistics as run one by one.
+    """
+    settings = [
+        {"fast_window": 5, "slow_window": 20},
+        {"fast_window": 10, "slow_window": 30},
+    ]
+
+    engine = create_engine(DoubleMaStrategy)
+    df = engine.run_batch_backtesting(
+        [(DoubleMaStrategy, setting) for setting in settings],
+        output=False,
+        max_workers=max_workers
+    )
+
+    for setting, (_, row) in zip(settings, df.iterrows()):
+        base = run_backtesting(DoubleMaStrategy, setting)
+
+        for key, value in base["statistics"].items():
+            assert row[key] == value, key
+
+
+def test_precompute(database):
+    """
+    Precomputed indicators give the same trades as incremental calculation.
+    """
+    base = run_backtesting(DoubleMaStrategy)
+    result = run_backtesting(DoubleMaStrategy, precompute=True)
+    assert_same_result(result, base)
+
+
+def test_get_indicator_before_start(database):
+    """
+    Indicator value before the first bar is nan instead of wrapping around.
+    """
+    engine = create_engine(DoubleMaStrategy)
+    strategy = engine.strategy
+    strategy.indicators = {"fast_ma": np.arange(10, dtype=float)}
+
+    strategy.bar_index = 0
+    assert strategy.get_indicator("fast_ma") == 0
+    assert np.isnan(strategy.get_indicator("fast_ma", 1))
+
+    strategy.bar_index = 5
+    assert strategy.get_indicator("fast_ma", 2) == 3
+
+
+def test_walk_forward_empty_window(database):
+    """
+    Windows without trade are counted with zero pnl, and the ones no
+    setting traded in-sample have no result.
+    """
+    optimization_setting = OptimizationSetting()
+    optimization_setting.add_parameter("trade_day", 4, 10, 6)
+    optimization_setting.set_target("total_net_pnl")
+
+    engine = create_engine(DayStrategy)
+    results = engine.run_walk_forward(optimization_setting, 5, 3, output=False, max_workers=2)
+
+    assert [r["test_start"].day for r in results] == [8, 11, 14, 17, 20]
+    assert [r["setting"] for r in results[3:]] == [None, None]
+    assert all(r["setting"] for r in results[:3])
+
+    # All days of test windows are counted
+    df = engine.daily_df
+    dates = [date(2022, 1, 8) + timedelta(days=n) for n in range(15)]
+    assert list(df.index) == dates
+    assert not df.loc[date(2022, 1, 11):, "net_pnl"].any()
+
+    statistics = engine.calculate_statistics(output=False)
+    assert statistics["total_days"] == 15
+
+
+class NoCopyList(list):
+    """
+    List of history data which fails if a slice copy is made.
+    """
+
+    def __getitem__(self, ix):
+        """"""
+        if isinstance(ix, slice):
+            raise AssertionError("history data copied")
+        return super().__getitem__(ix)
+
+    def __copy__(self):
+        """"""
+        raise AssertionError("history data copied")
+
+
+def test_replay_without_copy(database):
+    """
+    History data is replayed from the iterator used in init without copy.
+    """
+    base = run_backtesting(DoubleMaStrategy)
+
+    engine = create_engine(DoubleMaStrategy)
+    engine.load_data()
+    engine.history_data = NoCopyList(engine.history_data)
+    engine.run_backtesting()
+
+    assert get_trades(engine) == base["trades"]
+
+
+def test_daily_pnl_same_as_loop(database):
+    """
+    Vectorized daily pnl is identical to DailyResult.calculate_pnl day by day.
+    """
+    for inverse in [False, True]:
+        result = run_backtesting(DoubleMaStrategy, inverse=inverse)
+        engine = result["engine"]
+        df = result["df"]
+
+        pre_close = 0
+        start_pos = 0
+
+        for d, row in df.iterrows():
+            daily_result = DailyResult(d, row["close_price"])
+            for trade in row["trades"]:
+                daily_result.add_trade(trade)
+
+            daily_result.calculate_pnl(
+                pre_close, start_pos, engine.size, engine.rate, engine.slippage, inverse
+            )
+            pre_close = daily_result.close_price
+            start_pos = daily_result.end_pos
+
+            for key, value in daily_result.__dict__.items():
+                if key not in {"date", "trades"}:
+                    assert row[key] == value, (d, key)
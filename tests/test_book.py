@@ -0,0 +1,84 @@
+"""
+Tests of price sorted order books.
+"""
+
+from datetime import datetime
+
+from vnpy.trader.constant import Direction, Offset
+
+from vnpy_ctastrategy.base import StopOrder
+from vnpy_ctastrategy.book import PriceBook, StopOrderBook
+
+
+def create_stop_order(stop_orderid: str, direction: Direction, price: float, vt_symbol: str = "rb.SHFE") -> StopOrder:
+    """"""
+    return StopOrder(
+        vt_symbol=vt_symbol,
+        direction=direction,
+        offset=Offset.OPEN,
+        price=price,
+        volume=1,
+        stop_orderid=stop_orderid,
+        strategy_name="s1",
+        datetime=datetime(2022, 1, 3)
+    )
+
+
+def test_price_book():
+    """
+    Orders crossed are found by price and keep sending sequence.
+    """
+    book = PriceBook()
+    book.add("a", 100, 1)
+    book.add("b", 90, 2)
+    book.add("c", 100, 3)
+    book.add("d", 110, 4)
+
+    assert len(book) == 4
+    assert "c" in book
+
+    assert book.get_above(100) == [(1, "a"), (3, "c"), (4, "d")]
+    assert book.get_above(111) == []
+    assert book.get_below(100) == [(2, "b"), (1, "a"), (3, "c")]
+    assert book.get_below(89) == []
+
+    book.remove("a")
+    book.remove("x")
+    assert "a" not in book
+    assert book.get_above(100) == [(3, "c"), (4, "d")]
+
+    book.clear()
+    assert not book
+    assert book.get_below(1000) == []
+
+
+def test_stop_order_book():
+    """
+    Triggered stop orders are returned in sending sequence of both directions.
+    """
+    book = StopOrderBook()
+    book.add(create_stop_order("STOP.1", Direction.LONG, 105))
+    book.add(create_stop_order("STOP.2", Direction.SHORT, 95))
+    book.add(create_stop_order("STOP.3", Direction.LONG, 100))
+    book.add(create_stop_order("STOP.4", Direction.SHORT, 100))
+    book.add(create_stop_order("STOP.5", Direction.LONG, 90, "hc.SHFE"))
+
+    assert len(book) == 5
+    assert book.has_symbol("hc.SHFE")
+    assert not book.has_symbol("i.DCE")
+
+    # Long stop is triggered by price rising above, short by price falling below
+    assert book.get_triggered("rb.SHFE", 100, 100) == ["STOP.3", "STOP.4"]
+    assert book.get_triggered("rb.SHFE", 110, 90) == ["STOP.1", "STOP.2", "STOP.3", "STOP.4"]
+    assert book.get_triggered("rb.SHFE", 99, 101) == []
+
+    book.remove("STOP.3")
+    book.remove("STOP.3")
+    assert "STOP.3" not in book
+    assert book.get_triggered("rb.SHFE", 110, 110) == ["STOP.1"]
+
+    book.remove("STOP.5")
+    assert not book.has_symbol("hc.SHFE")
+
+    book.clear()
+    assert not len(book)
@@ -0,0 +1,230 @@
+"""
+Tests of warm-up data loading and strategy management in CtaEngine.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from vnpy.event import Event, EVENT_TIMER
+from vnpy.trader.constant import Interval
+
+from vnpy_ctastrategy.base import EVENT_CTA_INIT, EVENT_CTA_STRATEGY, EVENT_CTA_STRATEGY_CHANGE
+from vnpy_ctastrategy.strategies.double_ma_strategy import DoubleMaStrategy
+
+
+VT_SYMBOL = "rb.SHFE"
+
+
+def test_load_bar_head_and_tail(cta_engine):
+    """
+    Cached bars are extended by querying only the missing range.
+    """
+    datafeed = cta_engine.datafeed
+    cta_engine.initing_strategies.add("s1")
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    assert len(datafeed.requests) == 1
+    assert bars[-1].datetime - bars[0].datetime >= timedelta(hours=23)
+
+    # Older bars are queried only before cached range
+    bars = cta_engine.load_bar(VT_SYMBOL, 2, Interval.MINUTE, None, False)
+    assert len(datafeed.requests) == 2
+    assert datafeed.requests[1].end <= datafeed.requests[0].start + timedelta(minutes=1)
+    assert bars[-1].datetime - bars[0].datetime >= timedelta(hours=47)
+
+    datetimes = [bar.datetime for bar in bars]
+    assert datetimes == sorted(set(datetimes))
+
+    # Newer bars are queried from the last cached bar
+    key = (VT_SYMBOL, Interval.MINUTE, False)
+    cache = cta_engine.bar_cache[key]
+    cache[1] -= timedelta(minutes=5)
+    last_dt = cache[2][-1].datetime
+
+    cta_engine.load_bar(VT_SYMBOL, 2, Interval.MINUTE, None, False)
+    assert len(datafeed.requests) == 3
+    assert datafeed.requests[2].start == last_dt
+
+    # Cache is released after init
+    cta_engine.initing_strategies.clear()
+    cta_engine.release_bar_cache()
+    assert not cta_engine.bar_cache
+
+
+def test_load_bar_replace_forming_bar(cta_engine):
+    """
+    The forming last bar in cache is replaced by the one queried later.
+    """
+    cta_engine.initing_strategies.add("s1")
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    forming_bar = bars[-1]
+    assert forming_bar.volume == 0
+
+    # Forming bar is not saved into database
+    saved = cta_engine.database.bars[("rb", forming_bar.exchange, Interval.MINUTE)]
+    assert max(saved.keys()) < forming_bar.datetime.replace(tzinfo=None)
+
+    cta_engine.datafeed.version = 5
+    key = (VT_SYMBOL, Interval.MINUTE, False)
+    cta_engine.bar_cache[key][1] -= timedelta(minutes=5)
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    bar = [bar for bar in bars if bar.datetime == forming_bar.datetime][0]
+    assert bar.volume != 0
+
+    datetimes = [bar.datetime for bar in bars]
+    assert datetimes == sorted(set(datetimes))
+
+
+def test_load_bar_concurrent(cta_engine):
+    """
+    Loads of the same key are served one by one and share cached bars.
+    """
+    cta_engine.initing_strategies.add("s1")
+
+    days = [3, 3, 5, 3, 2, 5, 1, 3]
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(
+            lambda n: cta_engine.load_bar(VT_SYMBOL, n, Interval.MINUTE, None, False),
+            days
+        ))
+
+    assert cta_engine.datafeed.max_running == 1
+    assert len(cta_engine.datafeed.requests) <= 3
+
+    for n, bars in zip(days, results):
+        assert bars[-1].datetime - bars[0].datetime >= timedelta(days=n, minutes=-2)
+
+
+def test_load_bar_naive_datetime(cta_engine):
+    """
+    Naive datetime returned by datafeed is converted into local time.
+    """
+    cta_engine.datafeed.naive = True
+    cta_engine.initing_strategies.add("s1")
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    assert bars and all(bar.datetime.tzinfo for bar in bars)
+
+
+def test_load_bar_use_database(cta_engine):
+    """
+    Bars loaded with and without use_database are cached separately.
+    """
+    cta_engine.initing_strategies.add("s1")
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, True)
+    assert not bars
+    assert not cta_engine.datafeed.requests
+
+    bars = cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    assert bars
+    assert len(cta_engine.datafeed.requests) == 1
+
+
+def test_load_bar_not_cached_after_init(cta_engine):
+    """
+    Bars loaded when no strategy is initing are not kept in cache.
+    """
+    cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+    cta_engine.load_bar(VT_SYMBOL, 1, Interval.MINUTE, None, False)
+
+    assert not cta_engine.bar_cache
+    assert len(cta_engine.datafeed.requests) >= 2
+
+
+def test_query_bar_from_database(cta_engine):
+    """
+    Bars saved in database are not queried from datafeed again.
+    """
+    datafeed = cta_engine.datafeed
+
+    cta_engine.load_bar(VT_SYMBOL, 10, Interval.MINUTE, None, False)
+    first_req = datafeed.requests[0]
+
+    # Only bars after the last saved one are queried
+    bars = cta_engine.load_bar(VT_SYMBOL, 10, Interval.MINUTE, None, False)
+    assert len(datafeed.requests) == 2
+    assert datafeed.requests[1].start >= first_req.end - timedelta(minutes=2)
+    assert bars[-1].datetime - bars[0].datetime >= timedelta(days=10, minutes=-2)
+
+    datetimes = [bar.datetime for bar in bars]
+    assert datetimes == sorted(set(datetimes))
+
+    # Older bars are queried only before the first saved one
+    bars = cta_engine.load_bar(VT_SYMBOL, 12, Interval.MINUTE, None, False)
+    assert len(datafeed.requests) == 4
+    assert datafeed.requests[2].end <= first_req.start + timedelta(minutes=1)
+    assert bars[-1].datetime - bars[0].datetime >= timedelta(days=12, minutes=-2)
+
+    datetimes = [bar.datetime for bar in bars]
+    assert datetimes == sorted(set(datetimes))
+
+
+def test_strategy_event_throttle(cta_engine):
+    """
+    Strategy events are throttled, full data is always put with
+    EVENT_CTA_STRATEGY and changed data with EVENT_CTA_STRATEGY_CHANGE.
+    """
+    events = cta_engine.events
+    cta_engine.strategy_event_interval = 60
+
+    strategy = DoubleMaStrategy(cta_engine, "s1", VT_SYMBOL, {})
+    cta_engine.strategies["s1"] = strategy
+
+    cta_engine.put_strategy_event(strategy)
+    assert [e.type for e in events] == [EVENT_CTA_STRATEGY]
+
+    # Throttled event is put by timer
+    strategy.fast_ma0 = 1.5
+    cta_engine.put_strategy_event(strategy)
+    assert len(events) == 1
+    assert "s1" in cta_engine.pending_strategy_events
+
+    cta_engine.process_timer_event(Event(EVENT_TIMER))
+    assert not cta_engine.pending_strategy_events
+    assert [e.type for e in events[1:]] == [EVENT_CTA_STRATEGY, EVENT_CTA_STRATEGY_CHANGE]
+
+    assert events[1].data == strategy.get_data()
+    assert events[2].data == {
+        "strategy_name": "s1",
+        "parameters": {},
+        "variables": {"fast_ma0": 1.5},
+    }
+
+    # Event without any change is skipped
+    cta_engine.put_strategy_event(strategy, force=True)
+    assert len(events) == 3
+
+
+def test_init_pool(cta_engine):
+    """
+    Strategies are inited in parallel, while queries are run one by one.
+    """
+    cta_engine.init_executor.shutdown()
+    cta_engine.init_executor = ThreadPoolExecutor(4)
+
+    vt_symbols = ["rb.SHFE", "hc.SHFE", "rb.SHFE", "i.DCE", "j.DCE", "hc.SHFE"]
+    for n, vt_symbol in enumerate(vt_symbols):
+        strategy_name = f"s{n}"
+        strategy = DoubleMaStrategy(cta_engine, strategy_name, vt_symbol, {})
+        cta_engine.strategies[strategy_name] = strategy
+
+    for strategy_name in cta_engine.strategies:
+        cta_engine.init_strategy(strategy_name)
+    cta_engine.init_executor.shutdown()
+
+    assert cta_engine.datafeed.max_running == 1
+
+    # Finish init in event engine thread
+    init_events = [e for e in cta_engine.events if e.type == EVENT_CTA_INIT]
+    assert len(init_events) == len(vt_symbols)
+
+    for event in init_events:
+        cta_engine.process_init_event(event)
+
+    assert all(strategy.inited for strategy in cta_engine.strategies.values())
+    assert not cta_engine.initing_strategies
+    assert not cta_engine.bar_cache
+    assert cta_engine.init_finished == len(vt_symbols)
@@ -0,0 +1,132 @@
+"""
+Tests of columnar history array and local history cache.
+"""
+
+from datetime import datetime, timedelta
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ
+
+from vnpy_ctastrategy.backtesting import BacktestingEngine
+from vnpy_ctastrategy.base import BacktestingMode
+from vnpy_ctastrategy.history import HistoryArray, HistoryCache
+
+from conftest import generate_bars
+
+
+def load_cached(start: datetime, end: datetime) -> HistoryArray:
+    """
+    Load bar data with local cache enabled.
+    """
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(
+        "rb.SHFE", "1m", start, 0, 0, 1, 1, end=end, use_cache=True
+    )
+    engine.load_data()
+    return engine.history_data
+
+
+def get_cache() -> HistoryCache:
+    """"""
+    return HistoryCache(BacktestingMode.BAR, "rb", Exchange.SHFE, Interval.MINUTE)
+
+
+def test_between_naive_datetime():
+    """
+    Naive datetime is treated as DB_TZ time.
+    """
+    array = HistoryArray.from_data(BacktestingMode.BAR, generate_bars(days=2))
+
+    start = datetime(2022, 1, 3, 10)
+    end = datetime(2022, 1, 4, 10)
+    data = array.between(start, end)
+
+    assert data[0].datetime == DB_TZ.localize(start)
+    assert data[-1].datetime == DB_TZ.localize(end)
+    assert len(data) == len(array.between(DB_TZ.localize(start), DB_TZ.localize(end)))
+
+
+def test_cache_disjoint_entries(database):
+    """
+    Entries of disjoint ranges are kept, and then joined when overlapped.
+    """
+    data = load_cached(datetime(2022, 1, 3), datetime(2022, 1, 10))
+    assert data[0].datetime == DB_TZ.localize(datetime(2022, 1, 3, 9))
+    assert len(get_cache().get_entries()) == 1
+
+    load_cached(datetime(2022, 1, 15), datetime(2022, 1, 20))
+    assert len(get_cache().get_entries()) == 2
+
+    # Served from the first entry without database query
+    database.queries.clear()
+    data = load_cached(datetime(2022, 1, 5), datetime(2022, 1, 7))
+    assert not database.queries
+    assert len(data) == 2 * 240
+
+    # Only the gap between entries is queried
+    data = load_cached(datetime(2022, 1, 8), datetime(2022, 1, 16))
+    assert database.queries
+    for _, start, end in database.queries:
+        assert start >= datetime(2022, 1, 9, 13)
+        assert end <= datetime(2022, 1, 15)
+
+    entries = get_cache().get_entries()
+    assert len(entries) == 1
+
+    # Joined entry has the same data as database, only range after the
+    # last bar is queried again.
+    database.queries.clear()
+    data = load_cached(datetime(2022, 1, 3), datetime(2022, 1, 20))
+    for _, start, _ in database.queries:
+        assert start >= datetime(2022, 1, 19, 13)
+    assert get_cache().get_entries() == entries
+
+    bars = database.load_bar_data("rb", Exchange.SHFE, Interval.MINUTE, datetime(2022, 1, 3), datetime(2022, 1, 20))
+    assert [bar.datetime for bar in data] == [bar.datetime for bar in bars]
+    assert [bar.close_price for bar in data] == [bar.close_price for bar in bars]
+
+
+def test_cache_end_after_last_bar(database):
+    """
+    Data saved into database after cached is loaded next time.
+    """
+    end = datetime(2022, 2, 10)
+
+    data = load_cached(datetime(2022, 1, 18), end)
+    last_dt = data[-1].datetime
+
+    _, entry_end, _ = get_cache().get_entries()[0]
+    assert entry_end < last_dt + timedelta(minutes=1)
+
+    new_bars = generate_bars(start=datetime(2022, 1, 23, 9), days=1, seed=8)
+    database.save_bar_data(new_bars)
+
+    database.queries.clear()
+    data = load_cached(datetime(2022, 1, 18), end)
+    assert data[-1].datetime == new_bars[-1].datetime
+
+    # Only the range after cached entry is queried
+    for _, start, _ in database.queries:
+        assert start > last_dt.replace(tzinfo=None)
+
+
+def test_cache_extension(database):
+    """
+    Cached entry is extended by querying only the range outside it.
+    """
+    load_cached(datetime(2022, 1, 6), datetime(2022, 1, 10))
+
+    database.queries.clear()
+    data = load_cached(datetime(2022, 1, 3), datetime(2022, 1, 15))
+
+    assert database.queries
+    for _, start, end in database.queries:
+        assert end <= datetime(2022, 1, 6) or start >= datetime(2022, 1, 9, 12)
+
+    entries = get_cache().get_entries()
+    assert len(entries) == 1
+
+    bars = database.load_bar_data("rb", Exchange.SHFE, Interval.MINUTE, datetime(2022, 1, 3), datetime(2022, 1, 15))
+    assert [bar.datetime for bar in data] == [bar.datetime for bar in bars]
+    assert [bar.close_price for bar in data] == [bar.close_price for bar in bars]
@@ -0,0 +1,33 @@
+"""
+Tests of optimization result cache.
+"""
+
+from vnpy_ctastrategy.backtesting import wrap_evaluate
+from vnpy_ctastrategy.strategies.double_ma_strategy import DoubleMaStrategy
+
+from test_backtesting import create_engine
+
+
+def test_result_cache(database):
+    """
+    Cached statistics are loaded without running backtesting again, but
+    not for evaluation requiring daily result.
+    """
+    engine = create_engine(DoubleMaStrategy)
+    engine.load_data()
+    result_cache = engine.create_result_cache()
+
+    setting = {"fast_window": 5, "slow_window": 20}
+    evaluate_func = wrap_evaluate(engine, "total_net_pnl", result_cache=result_cache)
+
+    result = evaluate_func(setting)
+    assert result_cache.load(setting) == result[2]
+
+    database.queries.clear()
+    assert evaluate_func(setting) == result
+    assert not database.queries
+
+    evaluate_func = wrap_evaluate(engine, "total_net_pnl", result_cache=result_cache, daily_result=True)
+    result = evaluate_func(setting)
+    assert len(result) == 4
+    assert result[3] is not None
@@ -0,0 +1,88 @@
+"""
+Tests of strategy data saved by journal and snapshot file.
+"""
+
+import json
+
+import pytest
+
+from vnpy_ctastrategy.persistence import StrategyDataWriter
+
+
+FILENAME = "cta_strategy_data.json"
+
+
+def test_journal_recovery(folder):
+    """
+    Changes in journal are recovered after crash without compaction.
+    """
+    writer = StrategyDataWriter(FILENAME)
+    assert writer.load() == {}
+
+    writer.update("s1", {"pos": 1, "prices": [1, 2]})
+    writer.update("s2", {"pos": -1})
+    writer.flush()
+
+    writer.update("s1", {"pos": 2, "prices": [1, 2]})
+    writer.flush()
+    assert writer.journal_path.exists()
+
+    # Broken last line left by crash during writing is ignored
+    with open(writer.journal_path, mode="a", encoding="UTF-8") as f:
+        f.write('["s2", {"pos"')
+
+    data = StrategyDataWriter(FILENAME).load()
+    assert data == {"s1": {"pos": 2, "prices": [1, 2]}, "s2": {"pos": -1}}
+
+    # Journal is compacted into snapshot file after loaded
+    assert not writer.journal_path.exists()
+    with open(writer.filepath, encoding="UTF-8") as f:
+        assert json.load(f) == data
+
+
+def test_compact(folder):
+    """
+    Journal is compacted after enough records, and when writer closed.
+    """
+    writer = StrategyDataWriter(FILENAME, interval=0.01, compact_count=2)
+    writer.load()
+
+    writer.update("s1", {"pos": 1})
+    writer.flush()
+    assert writer.journal_path.exists()
+
+    writer.update("s1", {"pos": 2})
+    writer.flush()
+    assert not writer.journal_path.exists()
+
+    writer.start()
+    writer.update("s1", {"pos": 3})
+    writer.close()
+
+    assert not writer.journal_path.exists()
+    with open(writer.filepath, encoding="UTF-8") as f:
+        assert json.load(f) == {"s1": {"pos": 3}}
+
+
+def test_retry_failed_write(folder, monkeypatch):
+    """
+    Changes failed to write are kept, and newer changes are not overwritten.
+    """
+    writer = StrategyDataWriter(FILENAME)
+    writer.load()
+
+    def write_journal(dirty: dict) -> None:
+        writer.update("s1", {"pos": 3})
+        raise OSError("disk full")
+
+    writer.update("s1", {"pos": 1, "price": 100})
+
+    with monkeypatch.context() as m:
+        m.setattr(writer, "write_journal", write_journal)
+        with pytest.raises(OSError):
+            writer.flush()
+
+    assert writer.dirty == {"s1": {"pos": 3, "price": 100}}
+
+    writer.flush()
+    assert StrategyDataWriter(FILENAME).load() == {"s1": {"pos": 3, "price": 100}}
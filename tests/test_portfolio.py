@@ -0,0 +1,66 @@
+"""
+Tests of portfolio backtesting with several engines.
+"""
+
+from vnpy.trader.constant import Interval
+
+from vnpy_ctastrategy.portfolio import PortfolioBacktestingEngine
+from vnpy_ctastrategy.strategies.double_ma_strategy import DoubleMaStrategy
+
+from test_backtesting import END, START, get_trades, run_backtesting
+
+
+class InitErrorStrategy(DoubleMaStrategy):
+    """"""
+
+    def on_bar(self, bar):
+        """"""
+        raise ValueError("init error")
+
+
+class BarErrorStrategy(DoubleMaStrategy):
+    """"""
+
+    def on_bar(self, bar):
+        """"""
+        if self.inited and self.trading and bar.datetime.day == 16:
+            raise ValueError("bar error")
+        super().on_bar(bar)
+
+
+def create_portfolio(strategy_classes: list) -> tuple:
+    """
+    Create portfolio engine with each strategy trading rb.SHFE.
+    """
+    messages = []
+
+    portfolio = PortfolioBacktestingEngine()
+    portfolio.output = messages.append
+    portfolio.set_parameters(START, END)
+
+    for strategy_class in strategy_classes:
+        portfolio.add_strategy(
+            strategy_class, {}, "rb.SHFE", Interval.MINUTE, 0.0001, 1, 10, 1
+        )
+
+    portfolio.load_data()
+    return portfolio, messages
+
+
+def test_skip_failed_engine(database):
+    """
+    Engine failed in init or replay is skipped, and others keep running.
+    """
+    portfolio, messages = create_portfolio([InitErrorStrategy, BarErrorStrategy, DoubleMaStrategy])
+    portfolio.run_backtesting()
+
+    assert any("初始化失败" in msg for msg in messages)
+    assert any("该合约回测终止" in msg for msg in messages)
+    assert messages[-1] == "组合历史数据回放结束"
+
+    failed_engine = portfolio.engines[1]
+    assert all(trade.datetime.day < 16 for trade in failed_engine.get_all_trades())
+
+    # Result of the healthy engine is not affected
+    base = run_backtesting(DoubleMaStrategy)
+    assert get_trades(portfolio.engines[2]) == base["trades"]
@@ -31,6 +31,8 @@ from vnpy.trader.utility import BarGenerator, ArrayManager
 
 from .base import APP_NAME, StopOrder
 from .engine import CtaEngine
+from .history import HistoryArray, update_array_manager
+from .indicator import HistoryArrayManager
 from .template import CtaTemplate, CtaSignal, TargetPosTemplate
 
 
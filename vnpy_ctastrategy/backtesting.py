@@ -1,19 +1,32 @@
 from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait
+)
 from datetime import date, datetime, timedelta
-from typing import Callable, List
+from math import ceil
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Callable, List, Optional
 from functools import lru_cache, partial
+from itertools import chain, islice
+from uuid import uuid4
+import shutil
 import traceback
 
 import numpy as np
-from pandas import DataFrame
+from pandas import DataFrame, Index, concat, to_datetime
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from vnpy.trader.constant import (Direction, Offset, Exchange,
                                   Interval, Status)
-from vnpy.trader.database import get_database
+from vnpy.trader.database import get_database, DB_TZ
 from vnpy.trader.object import OrderData, TradeData, BarData, TickData
-from vnpy.trader.utility import round_to
+from vnpy.trader.utility import round_to, get_folder_path
 from vnpy.trader.optimize import (
     OptimizationSetting,
     check_optimization_setting,
@@ -29,6 +42,18 @@ from .base import (
     StopOrderStatus,
     INTERVAL_DELTA_MAP
 )
+from .book import PriceBook, StopOrderBook
+from .history import (
+    HistoryArray,
+    HistoryCache,
+    SharedHistory,
+    attach_shared_history,
+    shared_memory,
+    to_utc,
+    from_utc
+)
+from .indicator import IndicatorCache, set_indicator_path
+from .optimization import ResultCache, get_class_hash, get_result_key
 from .template import CtaTemplate
 
 
@@ -54,6 +79,14 @@ class BacktestingEngine:
         self.annual_days: int = 240
         self.mode = BacktestingMode.BAR
         self.inverse = False
+        self.columnar = False
+        self.use_cache = False
+        self.load_workers = 1
+        self.streaming = False
+        self.precompute = False
+
+        # Data before trading start is only used for initializing strategy
+        self.trading_start: datetime = None
 
         self.strategy_class = None
         self.strategy = None
@@ -69,10 +102,14 @@ class BacktestingEngine:
         self.stop_order_count = 0
         self.stop_orders = {}
         self.active_stop_orders = {}
+        self.stop_order_book = StopOrderBook()
 
         self.limit_order_count = 0
         self.limit_orders = {}
         self.active_limit_orders = {}
+        self.submitting_limit_orders = {}
+        self.long_limit_book = PriceBook()
+        self.short_limit_book = PriceBook()
 
         self.trade_count = 0
         self.trades = {}
@@ -94,10 +131,14 @@ class BacktestingEngine:
         self.stop_order_count = 0
         self.stop_orders.clear()
         self.active_stop_orders.clear()
+        self.stop_order_book.clear()
 
         self.limit_order_count = 0
         self.limit_orders.clear()
         self.active_limit_orders.clear()
+        self.submitting_limit_orders.clear()
+        self.long_limit_book.clear()
+        self.short_limit_book.clear()
 
         self.trade_count = 0
         self.trades.clear()
@@ -119,7 +160,12 @@ class BacktestingEngine:
         mode: BacktestingMode = BacktestingMode.BAR,
         inverse: bool = False,
         risk_free: float = 0,
-        annual_days: int = 240
+        annual_days: int = 240,
+        columnar: bool = False,
+        use_cache: bool = False,
+        load_workers: int = 1,
+        streaming: bool = False,
+        precompute: bool = False
     ):
         """"""
         self.mode = mode
@@ -140,6 +186,11 @@ class BacktestingEngine:
         self.inverse = inverse
         self.risk_free = risk_free
         self.annual_days = annual_days
+        self.columnar = columnar
+        self.use_cache = use_cache
+        self.load_workers = load_workers
+        self.streaming = streaming
+        self.precompute = precompute
 
     def add_strategy(self, strategy_class: type, setting: dict):
         """"""
@@ -159,49 +210,187 @@ class BacktestingEngine:
             self.output("起始日期必须小于结束日期")
             return
 
-        self.history_data.clear()       # Clear previously loaded history data
+        # Data will be pulled chunk by chunk during replay in streaming mode
+        if self.streaming:
+            self.history_data = []
+            self.output("流式回放模式，历史数据将在回放过程中分块加载")
+            return
+
+        if self.use_cache:
+            self.history_data = self.load_cached_data()
+        else:
+            self.history_data = self.load_range(self.start, self.end, self.columnar)
+
+        self.output(f"历史数据加载完成，数据量：{len(self.history_data)}")
 
+    def load_range(self, start: datetime, end: datetime, columnar: bool):
+        """
+        Load history data within [start, end] from database chunk by chunk.
+        """
         # Load 30 days of data each time and allow for progress update
-        total_days = (self.end - self.start).days
+        total_days = max((end - start).days, 1)
         progress_days = max(int(total_days / 10), 1)
         progress_delta = timedelta(days=progress_days)
+
+        ranges = self.split_range(start, end, progress_delta)
+
+        if self.load_workers > 1:
+            chunks = self.load_chunks_parallel(ranges, columnar)
+        else:
+            chunks = []
+            progress = 0
+
+            for start, end in ranges:
+                progress_bar = "#" * int(progress * 10 + 1)
+                self.output(f"加载进度：{progress_bar} [{progress:.0%}]")
+
+                chunks.append(self.load_chunk(start, end, columnar))
+
+                progress += progress_days / total_days
+                progress = min(progress, 1)
+
+        # Join chunks into one array or list
+        if columnar:
+            return HistoryArray.concat(self.mode, chunks)
+
+        history_data = []
+        for data in chunks:
+            history_data.extend(data)
+        return history_data
+
+    def split_range(self, start: datetime, end: datetime, delta: timedelta) -> list:
+        """
+        Split [start, end] into chunks of delta length.
+        """
         interval_delta = INTERVAL_DELTA_MAP[self.interval]
 
-        start = self.start
-        end = self.start + progress_delta
-        progress = 0
+        ranges = []
+        range_end = end
+        end = start + delta
 
-        while start < self.end:
-            progress_bar = "#" * int(progress * 10 + 1)
-            self.output(f"加载进度：{progress_bar} [{progress:.0%}]")
+        while start < range_end:
+            end = min(end, range_end)  # Make sure end time stays within set range
+            ranges.append((start, end))
 
-            end = min(end, self.end)  # Make sure end time stays within set range
+            start = end + interval_delta
+            end += delta
 
-            if self.mode == BacktestingMode.BAR:
-                data = load_bar_data(
-                    self.symbol,
-                    self.exchange,
-                    self.interval,
-                    start,
-                    end
-                )
+        return ranges
+
+    def load_chunks_parallel(self, ranges: list, columnar: bool) -> list:
+        """
+        Load chunks concurrently with thread pool, return in original order.
+        """
+        # Make sure database instance is created before used in threads
+        get_database()
+
+        chunks = [None] * len(ranges)
+
+        with ThreadPoolExecutor(max_workers=self.load_workers) as executor:
+            futures = {}
+            for ix, (start, end) in enumerate(ranges):
+                future = executor.submit(self.load_chunk, start, end, columnar)
+                futures[future] = ix
+
+            for count, future in enumerate(as_completed(futures), 1):
+                chunks[futures[future]] = future.result()
+
+                progress = count / len(ranges)
+                progress_bar = "#" * int(progress * 10 + 1)
+                self.output(f"加载进度：{progress_bar} [{progress:.0%}]")
+
+        return chunks
+
+    def load_chunk(self, start: datetime, end: datetime, columnar: bool):
+        """
+        Load history data of one time range.
+        """
+        if self.mode == BacktestingMode.BAR:
+            if columnar:
+                func = load_bar_array
             else:
-                data = load_tick_data(
-                    self.symbol,
-                    self.exchange,
-                    start,
-                    end
-                )
+                func = load_bar_data
+
+            return func(
+                self.symbol,
+                self.exchange,
+                self.interval,
+                start,
+                end
+            )
+        else:
+            if columnar:
+                func = load_tick_array
+            else:
+                func = load_tick_data
 
-            self.history_data.extend(data)
+            return func(
+                self.symbol,
+                self.exchange,
+                start,
+                end
+            )
 
-            progress += progress_days / total_days
-            progress = min(progress, 1)
+    def load_cached_data(self) -> HistoryArray:
+        """
+        Load history data from local cache, only query database for the
+        range not covered yet.
+        """
+        cache = HistoryCache(self.mode, self.symbol, self.exchange, self.interval)
 
-            start = end + interval_delta
-            end += progress_delta
+        data = cache.load(self.start, self.end)
+        if data is not None:
+            self.output("从本地缓存加载历史数据")
+            return data
 
-        self.output(f"历史数据加载完成，数据量：{len(self.history_data)}")
+        # Join cached entries overlapped with [start, end], and load ranges
+        # not covered from database.
+        start = to_utc(self.start)
+        end = to_utc(self.end)
+        entries = cache.get_overlapped_entries(start, end)
+
+        range_start = min([start] + [entry[0] for entry in entries])
+        range_end = max([end] + [entry[1] for entry in entries])
+
+        arrays = []
+        loaded = 0
+        pos = range_start
+
+        for entry_start, entry_end, path in entries:
+            if entry_end < pos:
+                continue
+
+            if pos < entry_start:
+                data = self.load_uncached_range(pos, entry_start - timedelta(microseconds=1))
+                arrays.append(data)
+                loaded += len(data)
+
+            arrays.append(HistoryArray.load(path).between(pos, entry_end))
+            pos = entry_end + timedelta(microseconds=1)
+
+        if pos <= range_end:
+            data = self.load_uncached_range(pos, range_end)
+            arrays.append(data)
+            loaded += len(data)
+
+        data = HistoryArray.concat(self.mode, arrays)
+
+        # Save joined data as one entry, replacing the ones it covers
+        if loaded or len(entries) > 1:
+            cache.save(data, range_start, range_end)
+            self.output("历史数据已写入本地缓存")
+
+        return data.between(start, end)
+
+    def load_uncached_range(self, start: datetime, end: datetime) -> HistoryArray:
+        """
+        Load data of range not covered by cache from database.
+        """
+        # Database query expects datetime in the same format as input
+        tzinfo = self.start.tzinfo
+
+        data = self.load_range(from_utc(start, tzinfo), from_utc(end, tzinfo), True)
+        return data.between(start, end)
 
     def run_backtesting(self):
         """"""
@@ -210,13 +399,155 @@ class BacktestingEngine:
         else:
             func = self.new_tick
 
+        if self.streaming:
+            if self.precompute:
+                self.output("流式回放模式不支持指标预计算")
+
+            self.run_streaming_backtesting(func)
+            return
+
+        result = self.init_backtesting()
+        if not result:
+            return
+        data_iterator, total_size = result
+
+        batch_size = max(int(total_size / 10), 1)
+
+        for ix, i in enumerate(range(0, total_size, batch_size)):
+            batch_data = islice(data_iterator, batch_size)
+            for data in batch_data:
+                try:
+                    func(data)
+                except Exception:
+                    self.output("触发异常，回测终止")
+                    self.output(traceback.format_exc())
+                    return
+
+            progress = min(ix / 10, 1)
+            progress_bar = "=" * (ix + 1)
+            self.output(f"回放进度：{progress_bar} [{progress:.0%}]")
+
+        self.strategy.on_stop()
+        self.output("历史数据回放结束")
+
+    def init_backtesting(self) -> Optional[tuple]:
+        """
+        Initialize strategy with the first [days] of history data.
+
+        Return iterator of the rest history data for replay and its size,
+        or None if initialization failed.
+        """
+        if self.precompute:
+            self.precompute_indicators()
+
         self.strategy.on_init()
 
         # Use the first [days] of history data for initializing strategy
         day_count = 0
         ix = 0
+        init_size = 0
+
+        batch_init = self.check_bar_history()
+        data_iterator = iter(self.history_data)
+
+        if self.precompute:
+            data_iterator = self.index_history_data(data_iterator)
+
+        # Naive datetime is treated as DB_TZ time, the same as data loading
+        trading_start = self.trading_start
+        if trading_start and not trading_start.tzinfo:
+            trading_start = DB_TZ.localize(trading_start)
+
+        for ix, data in enumerate(data_iterator):
+            new_day = self.datetime and data.datetime.day != self.datetime.day
+            if new_day:
+                day_count += 1
+
+            # Data before trading start is also used for initializing
+            if trading_start:
+                if day_count >= self.days and data.datetime >= trading_start:
+                    break
+            elif new_day and day_count >= self.days:
+                break
 
-        for ix, data in enumerate(self.history_data):
+            self.datetime = data.datetime
+            init_size = ix + 1
+
+            # Data is passed to strategy at once after loop
+            if batch_init:
+                continue
+
+            try:
+                self.callback(data)
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return None
+
+        if batch_init and init_size:
+            try:
+                self.new_bar_history(self.history_data[:init_size])
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return None
+
+        self.strategy.inited = True
+        self.output("策略初始化完成")
+
+        self.strategy.on_start()
+        self.strategy.trading = True
+        self.output("开始回放历史数据")
+
+        # Use the rest of history data for running backtesting
+        total_size = len(self.history_data) - ix
+        if total_size <= 1:
+            self.output("历史数据不足，回测终止")
+            return None
+
+        # Continue with the same iterator instead of copying history data,
+        # starting from the data not used for initializing.
+        data_iterator = chain([data], data_iterator)
+
+        return data_iterator, total_size
+
+    def precompute_indicators(self):
+        """
+        Calculate indicators of strategy over full history data at once.
+        """
+        if isinstance(self.history_data, HistoryArray):
+            history = self.history_data
+        else:
+            history = HistoryArray.from_data(self.mode, self.history_data)
+
+        self.strategy.indicators = self.strategy.calculate_indicators(history)
+        self.output("策略指标预计算完成")
+
+    def index_history_data(self, data_iterator):
+        """
+        Update index of current data in strategy, for reading precomputed indicators.
+        """
+        for ix, data in enumerate(data_iterator):
+            self.strategy.bar_index = ix
+            yield data
+
+    def run_streaming_backtesting(self, func: Callable):
+        """
+        Replay history data pulled from generator, without keeping all
+        data in memory.
+        """
+        stream = self.stream_history_data()
+
+        self.strategy.on_init()
+
+        # Use the first [days] of history data for initializing strategy
+        day_count = 0
+        data = None
+
+        batch_init = self.check_bar_history()
+        init_data = []
+
+        for data in stream:
             if self.datetime and data.datetime.day != self.datetime.day:
                 day_count += 1
                 if day_count >= self.days:
@@ -224,12 +555,27 @@ class BacktestingEngine:
 
             self.datetime = data.datetime
 
+            # Data is passed to strategy at once after loop
+            if batch_init:
+                init_data.append(data)
+                continue
+
             try:
                 self.callback(data)
             except Exception:
                 self.output("触发异常，回测终止")
                 self.output(traceback.format_exc())
                 return
+        else:
+            data = None
+
+        if init_data:
+            try:
+                self.new_bar_history(init_data)
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return
 
         self.strategy.inited = True
         self.output("策略初始化完成")
@@ -238,32 +584,83 @@ class BacktestingEngine:
         self.strategy.trading = True
         self.output("开始回放历史数据")
 
-        # Use the rest of history data for running backtesting
-        backtesting_data = self.history_data[ix:]
-        if len(backtesting_data) <= 1:
+        # Check rest of history data before running backtesting
+        next_data = next(stream, None)
+        if not data or not next_data:
             self.output("历史数据不足，回测终止")
             return
 
-        total_size = len(backtesting_data)
-        batch_size = max(int(total_size / 10), 1)
-
-        for ix, i in enumerate(range(0, total_size, batch_size)):
-            batch_data = backtesting_data[i: i + batch_size]
-            for data in batch_data:
-                try:
-                    func(data)
-                except Exception:
-                    self.output("触发异常，回测终止")
-                    self.output(traceback.format_exc())
-                    return
-
-            progress = min(ix / 10, 1)
-            progress_bar = "=" * (ix + 1)
-            self.output(f"回放进度：{progress_bar} [{progress:.0%}]")
+        for data in chain([data, next_data], stream):
+            try:
+                func(data)
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return
 
         self.strategy.on_stop()
         self.output("历史数据回放结束")
 
+    def check_bar_history(self) -> bool:
+        """
+        Check whether init bars should be passed to strategy in batch.
+        """
+        return (
+            self.mode == BacktestingMode.BAR
+            and self.callback is not None
+            and self.strategy.check_bar_history(self.callback)
+        )
+
+    def new_bar_history(self, data: list):
+        """
+        Pass all init bars to on_bar_history of strategy.
+        """
+        if isinstance(data, HistoryArray):
+            history = data
+        else:
+            history = HistoryArray.from_data(self.mode, data)
+
+        self.strategy.on_bar_history(history)
+
+    def stream_history_data(self):
+        """
+        Generator of history data loaded day by day from cache or database,
+        only one day of data is kept in memory.
+        """
+        if not self.end:
+            self.end = datetime.now()
+
+        ranges = self.split_range(self.start, self.end, timedelta(days=1))
+
+        cached_data = None
+        if self.use_cache:
+            cache = HistoryCache(self.mode, self.symbol, self.exchange, self.interval)
+            cached_data = cache.load(self.start, self.end)
+
+        database = get_database()
+        progress_count = 0
+
+        for ix, (start, end) in enumerate(ranges):
+            if cached_data is not None:
+                data = cached_data.between(start, end)
+            elif self.mode == BacktestingMode.BAR:
+                data = database.load_bar_data(
+                    self.symbol, self.exchange, self.interval, start, end
+                )
+            else:
+                data = database.load_tick_data(
+                    self.symbol, self.exchange, start, end
+                )
+
+            yield from data
+
+            # Output progress for every 10% of data replayed
+            progress = (ix + 1) / len(ranges)
+            if self.strategy.trading and int(progress * 10) > progress_count:
+                progress_count = int(progress * 10)
+                progress_bar = "=" * progress_count
+                self.output(f"回放进度：{progress_bar} [{progress:.0%}]")
+
     def calculate_result(self):
         """"""
         self.output("开始计算逐日盯市盈亏")
@@ -272,35 +669,54 @@ class BacktestingEngine:
             self.output("成交记录为空，无法计算")
             return
 
-        # Add trade data into daily reuslt.
-        for trade in self.trades.values():
-            d = trade.datetime.date()
-            daily_result = self.daily_results[d]
-            daily_result.add_trade(trade)
-
-        # Calculate daily result by iteration.
-        pre_close = 0
-        start_pos = 0
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close,
-                start_pos,
-                self.size,
-                self.rate,
-                self.slippage,
-                self.inverse
-            )
+        daily_results = list(self.daily_results.values())
+        day_ixs = {d: ix for ix, d in enumerate(self.daily_results.keys())}
+
+        # Add trade data into daily reuslt, and collect trade arrays in the
+        # same pass. Trades are in time order, so they are grouped by day.
+        trade_size = len(self.trades)
+        trade_ix = np.empty(trade_size, dtype=np.int64)
+        volume = np.empty(trade_size)
+        price = np.empty(trade_size)
+        long = np.empty(trade_size, dtype=bool)
+
+        for i, trade in enumerate(self.trades.values()):
+            ix = day_ixs[trade.datetime.date()]
+            daily_results[ix].add_trade(trade)
+
+            trade_ix[i] = ix
+            volume[i] = trade.volume
+            price[i] = trade.price
+            long[i] = trade.direction is Direction.LONG
+
+        # Calculate daily result with vectorized computation.
+        close_price = np.array([r.close_price for r in daily_results])
+
+        results = calculate_daily_pnl(
+            close_price,
+            trade_ix,
+            volume,
+            price,
+            long,
+            self.size,
+            self.rate,
+            self.slippage,
+            self.inverse
+        )
 
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
+        # Write result back into daily result objects.
+        columns = [(key, array.tolist()) for key, array in results.items()]
+
+        for ix, daily_result in enumerate(daily_results):
+            for key, values in columns:
+                setattr(daily_result, key, values[ix])
 
         # Generate dataframe
-        results = defaultdict(list)
+        results["date"] = [daily_result.date for daily_result in daily_results]
+        results["trades"] = [daily_result.trades for daily_result in daily_results]
 
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
+        keys = daily_results[0].__dict__.keys()
+        results = {key: results[key] for key in keys}
 
         self.daily_df = DataFrame.from_dict(results).set_index("date")
 
@@ -344,69 +760,57 @@ class BacktestingEngine:
             sharpe_ratio = 0
             return_drawdown_ratio = 0
         else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-
-            # When balance falls below 0, set daily return to 0
-            pre_balance = df["balance"].shift(1)
-            pre_balance.iloc[0] = self.capital
-            x = df["balance"] / pre_balance
-            x[x <= 0] = np.nan
-            df["return"] = np.log(x).fillna(0)
-
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
+            result = calculate_balance_statistics(
+                df["net_pnl"].to_numpy(),
+                self.capital,
+                self.annual_days,
+                self.risk_free
             )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
+
+            for name in ["balance", "return", "highlevel", "drawdown", "ddpercent"]:
+                df[name] = result[name]
 
             # Calculate statistics value
             start_date = df.index[0]
             end_date = df.index[-1]
 
+            net_pnl = df["net_pnl"].to_numpy()
             total_days = len(df)
-            profit_days = len(df[df["net_pnl"] > 0])
-            loss_days = len(df[df["net_pnl"] < 0])
+            profit_days = np.count_nonzero(net_pnl > 0)
+            loss_days = np.count_nonzero(net_pnl < 0)
 
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
+            end_balance = result["end_balance"]
+            max_drawdown = result["max_drawdown"]
+            max_ddpercent = result["max_ddpercent"]
+            max_drawdown_end = df.index[result["max_drawdown_end"]]
 
             if isinstance(max_drawdown_end, date):
-                max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
+                max_drawdown_start = df.index[result["max_drawdown_start"]]
                 max_drawdown_duration = (max_drawdown_end - max_drawdown_start).days
             else:
                 max_drawdown_duration = 0
 
-            total_net_pnl = df["net_pnl"].sum()
+            total_net_pnl = net_pnl.sum()
             daily_net_pnl = total_net_pnl / total_days
 
-            total_commission = df["commission"].sum()
+            total_commission = df["commission"].to_numpy().sum()
             daily_commission = total_commission / total_days
 
-            total_slippage = df["slippage"].sum()
+            total_slippage = df["slippage"].to_numpy().sum()
             daily_slippage = total_slippage / total_days
 
-            total_turnover = df["turnover"].sum()
+            total_turnover = df["turnover"].to_numpy().sum()
             daily_turnover = total_turnover / total_days
 
-            total_trade_count = df["trade_count"].sum()
+            total_trade_count = df["trade_count"].to_numpy().sum()
             daily_trade_count = total_trade_count / total_days
 
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * self.annual_days
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
-
-            if return_std:
-                daily_risk_free = self.risk_free / np.sqrt(self.annual_days)
-                sharpe_ratio = (daily_return - daily_risk_free) / return_std * np.sqrt(self.annual_days)
-            else:
-                sharpe_ratio = 0
-
-            return_drawdown_ratio = -total_return / max_ddpercent
+            total_return = result["total_return"]
+            annual_return = result["annual_return"]
+            daily_return = result["daily_return"]
+            return_std = result["return_std"]
+            sharpe_ratio = result["sharpe_ratio"]
+            return_drawdown_ratio = result["return_drawdown_ratio"]
 
         # Output
         if output:
@@ -524,19 +928,54 @@ class BacktestingEngine:
         fig.update_layout(height=1000, width=1000)
         fig.show()
 
-    def run_bf_optimization(self, optimization_setting: OptimizationSetting, output=True):
+    def run_bf_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output=True,
+        share_data: bool = False,
+        cache_results: bool = False
+    ):
         """"""
         if not check_optimization_setting(optimization_setting):
             return
 
-        evaluate_func: callable = wrap_evaluate(self, optimization_setting.target_name)
-        results = run_bf_optimization(
-            evaluate_func,
-            optimization_setting,
-            get_target_value,
-            output=self.output
+        # Load history data once and share it with all worker processes
+        if share_data:
+            shared_history = self.share_history_data()
+        else:
+            shared_history = None
+
+        # Skip settings already backtested in previous optimization
+        if cache_results:
+            result_cache = self.create_result_cache()
+        else:
+            result_cache = None
+
+        # Share indicators calculated in precompute mode between workers
+        indicator_path = self.create_indicator_path()
+
+        evaluate_func: callable = wrap_evaluate(
+            self,
+            optimization_setting.target_name,
+            shared_history,
+            indicator_path,
+            result_cache
         )
 
+        try:
+            results = run_bf_optimization(
+                evaluate_func,
+                optimization_setting,
+                get_target_value,
+                output=self.output
+            )
+        finally:
+            if shared_history:
+                shared_history.close()
+
+            if indicator_path:
+                shutil.rmtree(indicator_path, ignore_errors=True)
+
         if output:
             for result in results:
                 msg: str = f"参数：{result[0]}, 目标：{result[1]}"
@@ -546,19 +985,155 @@ class BacktestingEngine:
 
     run_optimization = run_bf_optimization
 
-    def run_ga_optimization(self, optimization_setting: OptimizationSetting, output=True):
+    def run_ga_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output=True,
+        share_data: bool = False,
+        cache_results: bool = False
+    ):
         """"""
         if not check_optimization_setting(optimization_setting):
             return
 
-        evaluate_func: callable = wrap_evaluate(self, optimization_setting.target_name)
-        results = run_ga_optimization(
-            evaluate_func,
-            optimization_setting,
-            get_target_value,
-            output=self.output
+        # Load history data once and share it with all worker processes
+        if share_data:
+            shared_history = self.share_history_data()
+        else:
+            shared_history = None
+
+        # Skip settings already backtested in previous optimization
+        if cache_results:
+            result_cache = self.create_result_cache()
+        else:
+            result_cache = None
+
+        # Share indicators calculated in precompute mode between workers
+        indicator_path = self.create_indicator_path()
+
+        evaluate_func: callable = wrap_evaluate(
+            self,
+            optimization_setting.target_name,
+            shared_history,
+            indicator_path,
+            result_cache
         )
 
+        try:
+            results = run_ga_optimization(
+                evaluate_func,
+                optimization_setting,
+                get_target_value,
+                output=self.output
+            )
+        finally:
+            if shared_history:
+                shared_history.close()
+
+            if indicator_path:
+                shutil.rmtree(indicator_path, ignore_errors=True)
+
+        if output:
+            for result in results:
+                msg: str = f"参数：{result[0]}, 目标：{result[1]}"
+                self.output(msg)
+
+        return results
+
+    def run_sh_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output=True,
+        share_data: bool = False,
+        cache_results: bool = False,
+        rounds: int = 3,
+        eta: int = 3,
+        max_workers: int = None
+    ):
+        """
+        Run successive halving optimization.
+
+        All settings are first backtested on the first 1/eta^(rounds-1) of
+        the history period, and only the best 1/eta of them are kept for the
+        next round on an eta times longer period. Settings remaining in the
+        last round are backtested on the full period.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return
+
+        if rounds < 1:
+            self.output("逐轮淘汰轮数必须大于等于1，请检查")
+            return
+
+        if eta < 2:
+            self.output("逐轮淘汰比例必须大于等于2，请检查")
+            return
+
+        settings: List[dict] = optimization_setting.generate_settings()
+        target_name: str = optimization_setting.target_name
+
+        if not self.end:
+            self.end = datetime.now()
+
+        # Load history data once and share it with all worker processes
+        if share_data:
+            shared_history = self.share_history_data()
+        else:
+            shared_history = None
+
+        indicator_path = self.create_indicator_path()
+
+        self.output("开始执行逐轮淘汰算法优化")
+        self.output(f"参数优化空间：{len(settings)}")
+
+        start: float = perf_counter()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers,
+                mp_context=get_context("spawn")
+            ) as executor:
+                for n in range(rounds):
+                    if n == rounds - 1:
+                        end = self.end
+                    else:
+                        period = (self.end - self.start) / eta ** (rounds - 1 - n)
+                        end = self.start + max(period, timedelta(days=1))
+
+                    if cache_results:
+                        result_cache = self.create_result_cache(end)
+                    else:
+                        result_cache = None
+
+                    evaluate_func: callable = wrap_evaluate(
+                        self,
+                        target_name,
+                        shared_history,
+                        indicator_path,
+                        result_cache,
+                        end=end
+                    )
+
+                    self.output(f"第{n + 1}轮优化，回测区间：{self.start} - {end}，参数组合：{len(settings)}")
+
+                    results: list = list(executor.map(evaluate_func, settings))
+                    results.sort(reverse=True, key=get_target_value)
+
+                    # Keep settings with best target value for next round
+                    if n < rounds - 1:
+                        setting_map = {str(setting): setting for setting in settings}
+                        count = ceil(len(results) / eta)
+                        settings = [setting_map[result[0]] for result in results[:count]]
+        finally:
+            if shared_history:
+                shared_history.close()
+
+            if indicator_path:
+                shutil.rmtree(indicator_path, ignore_errors=True)
+
+        cost: int = int(perf_counter() - start)
+        self.output(f"逐轮淘汰算法优化完成，耗时{cost}秒")
+
         if output:
             for result in results:
                 msg: str = f"参数：{result[0]}, 目标：{result[1]}"
@@ -566,6 +1141,399 @@ class BacktestingEngine:
 
         return results
 
+    def run_walk_forward(
+        self,
+        optimization_setting: OptimizationSetting,
+        train_days: int,
+        test_days: int,
+        warmup_days: int = 30,
+        output=True,
+        max_workers: int = None
+    ):
+        """
+        Run walk-forward analysis.
+
+        Settings are optimized on each in-sample window of train_days, and
+        the best one is tested on the following test_days. Windows are
+        rolled forward by test_days, and out-of-sample daily results are
+        joined into one equity curve saved in daily_df.
+
+        The out-of-sample backtest starts warmup_days earlier, and all data
+        before the test window is only used for initializing strategy, so
+        that no position is opened with in-sample data. Trading starts
+        later than the test window if strategy requires more days of data
+        than warmup_days for initialization.
+
+        Window in which no setting traded in-sample has setting of None and
+        is not tested, its days are counted with zero pnl like other days
+        without trade.
+        """
+        if not check_optimization_setting(optimization_setting):
+            return
+
+        if self.streaming:
+            self.output("流式回放模式不支持滚动优化")
+            return
+
+        settings: List[dict] = optimization_setting.generate_settings()
+        setting_map: dict = {str(setting): setting for setting in settings}
+        target_name: str = optimization_setting.target_name
+
+        if not self.end:
+            self.end = datetime.now()
+
+        windows: List[tuple] = []
+        train_start: datetime = self.start
+
+        while True:
+            test_start = train_start + timedelta(days=train_days)
+            if test_start >= self.end:
+                break
+
+            test_end = min(test_start + timedelta(days=test_days), self.end)
+            windows.append((train_start, test_start, test_end))
+
+            train_start += timedelta(days=test_days)
+
+        if not windows:
+            self.output("回测区间不足一个样本内窗口，无法执行滚动优化")
+            return
+
+        # Load full range once, windows are sliced from shared memory
+        shared_history = self.share_history_data()
+        indicator_path = self.create_indicator_path()
+
+        # Trading dates of each test window, the last one includes end date
+        if not self.history_data:
+            self.load_data()
+        history_dates = get_history_dates(self.history_data)
+
+        window_dates: List[Index] = []
+        for train_start, test_start, test_end in windows:
+            last = test_end >= self.end
+            dates = [
+                d for d in history_dates
+                if test_start.date() <= d < test_end.date() or (last and d == test_end.date())
+            ]
+            window_dates.append(Index(dates, name="date"))
+
+        self.output("开始执行滚动优化")
+        self.output(f"滚动窗口数量：{len(windows)}")
+        self.output(f"参数优化空间：{len(settings)}")
+
+        start: float = perf_counter()
+
+        in_sample_results: dict = defaultdict(list)
+        best_results: dict = {}
+        results: dict = {}
+        dfs: dict = {}
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers,
+                mp_context=get_context("spawn")
+            ) as executor:
+                futures: dict = {}
+
+                for ix, (train_start, test_start, test_end) in enumerate(windows):
+                    evaluate_func: callable = wrap_evaluate(
+                        self,
+                        target_name,
+                        shared_history,
+                        indicator_path,
+                        start=train_start,
+                        end=test_start - timedelta(microseconds=1)
+                    )
+
+                    for setting in settings:
+                        future = executor.submit(evaluate_func, setting)
+                        futures[future] = (ix, False)
+
+                pending: set = set(futures.keys())
+
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        ix, out_of_sample = futures.pop(future)
+                        train_start, test_start, test_end = windows[ix]
+                        result = future.result()
+
+                        # Test best setting once all in-sample results are ready
+                        if not out_of_sample:
+                            in_sample_results[ix].append(result)
+                            if len(in_sample_results[ix]) < len(settings):
+                                continue
+
+                            window_results = in_sample_results.pop(ix)
+                            best_result = max(window_results, key=get_target_value)
+
+                            # Best setting is arbitrary if no setting traded
+                            if not any(r[2]["total_trade_count"] for r in window_results):
+                                results[ix] = {
+                                    "train_start": train_start,
+                                    "test_start": test_start,
+                                    "test_end": test_end,
+                                    "setting": None,
+                                    "in_sample_target": None,
+                                    "out_of_sample_net_pnl": 0,
+                                }
+                                dfs[ix] = create_empty_daily_df(window_dates[ix])
+
+                                self.output(f"窗口{ix + 1}样本内无成交，不执行样本外测试")
+                                continue
+
+                            best_results[ix] = best_result
+
+                            evaluate_func: callable = wrap_evaluate(
+                                self,
+                                target_name,
+                                shared_history,
+                                indicator_path,
+                                start=max(test_start - timedelta(days=warmup_days), self.start),
+                                end=test_end,
+                                daily_result=True,
+                                trading_start=test_start
+                            )
+
+                            future = executor.submit(evaluate_func, setting_map[best_result[0]])
+                            futures[future] = (ix, True)
+                            pending.add(future)
+                            continue
+
+                        # Remove warmup days and the first day of next window,
+                        # days without trade are filled with zero pnl so that
+                        # balance is carried over and counted in statistics.
+                        df = result[3]
+
+                        if df is None:
+                            dfs[ix] = create_empty_daily_df(window_dates[ix])
+                        else:
+                            dfs[ix] = df.reindex(window_dates[ix], fill_value=0)
+
+                        net_pnl = dfs[ix]["net_pnl"].sum()
+
+                        best_result = best_results.pop(ix)
+
+                        results[ix] = {
+                            "train_start": train_start,
+                            "test_start": test_start,
+                            "test_end": test_end,
+                            "setting": setting_map[best_result[0]],
+                            "in_sample_target": best_result[1],
+                            "out_of_sample_net_pnl": net_pnl,
+                        }
+
+                        self.output(
+                            f"窗口{ix + 1}完成，样本外区间：{test_start} - {test_end}，"
+                            f"参数：{best_result[0]}，样本外盈亏：{net_pnl:.2f}"
+                        )
+        finally:
+            if shared_history:
+                shared_history.close()
+
+            if indicator_path:
+                shutil.rmtree(indicator_path, ignore_errors=True)
+
+        cost: int = int(perf_counter() - start)
+        self.output(f"滚动优化完成，耗时{cost}秒")
+
+        if dfs:
+            self.daily_df = concat([dfs[ix] for ix in sorted(dfs.keys())])
+        else:
+            self.daily_df = None
+
+        if output:
+            self.calculate_statistics()
+
+        return [results[ix] for ix in sorted(results.keys())]
+
+    def run_batch_backtesting(
+        self,
+        strategies: List[tuple],
+        output=True,
+        max_workers: int = 1
+    ) -> DataFrame:
+        """
+        Backtest a list of (strategy_class, setting) on the same history data.
+
+        History data is loaded only once. With max_workers of 1, strategies
+        are replayed one by one in current process, otherwise they are run
+        in a process pool with history data shared through shared memory.
+
+        Return DataFrame of statistics with a row for each strategy.
+        """
+        if not self.end:
+            self.end = datetime.now()
+
+        if not self.history_data and not self.streaming:
+            self.load_data()
+
+        self.output("开始执行批量回测")
+        self.output(f"策略数量：{len(strategies)}")
+
+        start: float = perf_counter()
+
+        if max_workers == 1:
+            results = []
+
+            for strategy_class, setting in strategies:
+                engine = BacktestingEngine()
+
+                engine.set_parameters(
+                    vt_symbol=self.vt_symbol,
+                    interval=self.interval,
+                    start=self.start,
+                    rate=self.rate,
+                    slippage=self.slippage,
+                    size=self.size,
+                    pricetick=self.pricetick,
+                    capital=self.capital,
+                    end=self.end,
+                    mode=self.mode,
+                    inverse=self.inverse,
+                    risk_free=self.risk_free,
+                    annual_days=self.annual_days,
+                    columnar=self.columnar,
+                    use_cache=self.use_cache,
+                    load_workers=self.load_workers,
+                    streaming=self.streaming,
+                    precompute=self.precompute
+                )
+                engine.add_strategy(strategy_class, setting)
+
+                # Replay the same history data without copying
+                if self.streaming:
+                    engine.load_data()
+                else:
+                    engine.history_data = self.history_data
+
+                engine.run_backtesting()
+                engine.calculate_result()
+                statistics = engine.calculate_statistics(output=False)
+
+                results.append(statistics)
+        else:
+            shared_history = self.share_history_data()
+            indicator_path = self.create_indicator_path()
+
+            try:
+                with ProcessPoolExecutor(
+                    max_workers,
+                    mp_context=get_context("spawn")
+                ) as executor:
+                    futures = []
+
+                    for strategy_class, setting in strategies:
+                        evaluate_func: callable = wrap_evaluate(
+                            self,
+                            "total_net_pnl",
+                            shared_history,
+                            indicator_path,
+                            strategy_class=strategy_class
+                        )
+                        futures.append(executor.submit(evaluate_func, setting))
+
+                    results = [future.result()[2] for future in futures]
+            finally:
+                if shared_history:
+                    shared_history.close()
+
+                if indicator_path:
+                    shutil.rmtree(indicator_path, ignore_errors=True)
+
+        cost: int = int(perf_counter() - start)
+        self.output(f"批量回测完成，耗时{cost}秒")
+
+        rows = []
+        for (strategy_class, setting), statistics in zip(strategies, results):
+            row = {"strategy": strategy_class.__name__, "setting": str(setting)}
+            row.update(statistics)
+            rows.append(row)
+
+            if output:
+                msg: str = (
+                    f"策略：{row['strategy']}，参数：{row['setting']}，"
+                    f"总盈亏：{statistics['total_net_pnl']:,.2f}，"
+                    f"Sharpe Ratio：{statistics['sharpe_ratio']:,.2f}"
+                )
+                self.output(msg)
+
+        return DataFrame(rows)
+
+    def create_indicator_path(self) -> str:
+        """
+        Create temp folder for sharing indicator cache in precompute mode.
+        """
+        if not self.precompute or self.streaming:
+            return ""
+
+        path = get_folder_path(IndicatorCache.folder_name).joinpath(uuid4().hex)
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def create_result_cache(self, end: datetime = None) -> Optional[ResultCache]:
+        """
+        Create persistent result cache for current strategy, data and parameters.
+        """
+        if self.streaming:
+            self.output("流式回放模式不支持优化结果缓存")
+            return None
+
+        class_hash = get_class_hash(self.strategy_class, type(self))
+        if not class_hash:
+            self.output("无法获取策略源代码，不使用优化结果缓存")
+            return None
+
+        if not self.history_data:
+            self.load_data()
+
+        data = self.history_data
+        if not isinstance(data, HistoryArray):
+            data = HistoryArray.from_data(self.mode, data)
+
+        # All engine parameters which change statistics are included
+        parameters = [
+            self.vt_symbol,
+            self.interval,
+            self.start,
+            end or self.end,
+            self.rate,
+            self.slippage,
+            self.size,
+            self.pricetick,
+            self.capital,
+            self.mode,
+            self.inverse,
+            self.risk_free,
+            self.annual_days,
+            self.precompute
+        ]
+        key = get_result_key(class_hash, data.get_fingerprint(), parameters)
+
+        return ResultCache(key)
+
+    def share_history_data(self) -> Optional[SharedHistory]:
+        """
+        Publish history data into shared memory for optimization workers.
+        """
+        if not shared_memory:
+            self.output("当前Python版本不支持共享内存，将由优化进程各自加载数据")
+            return None
+
+        if self.streaming:
+            self.output("流式回放模式不支持共享内存，将由优化进程各自加载数据")
+            return None
+
+        if not self.history_data:
+            self.load_data()
+
+        data = self.history_data
+        if not isinstance(data, HistoryArray):
+            data = HistoryArray.from_data(self.mode, data)
+
+        return SharedHistory(data)
+
     def update_daily_close(self, price: float):
         """"""
         d = self.datetime.date()
@@ -613,7 +1581,19 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for order in list(self.active_limit_orders.values()):
+        # Only visit orders to be pushed as "not traded" or can be filled,
+        # in the same sequence as they were sent.
+        candidates = {(seq, vt_orderid) for vt_orderid, seq in self.submitting_limit_orders.items()}
+        self.submitting_limit_orders = {}
+
+        if long_cross_price > 0:
+            candidates.update(self.long_limit_book.get_above(long_cross_price))
+        if short_cross_price > 0:
+            candidates.update(self.short_limit_book.get_below(short_cross_price))
+
+        orders = [self.limit_orders[vt_orderid] for _, vt_orderid in sorted(candidates)]
+
+        for order in orders:
             # Push order update with status "not traded" (pending).
             if order.status == Status.SUBMITTING:
                 order.status = Status.NOTTRADED
@@ -640,8 +1620,7 @@ class BacktestingEngine:
             order.status = Status.ALLTRADED
             self.strategy.on_order(order)
 
-            if order.vt_orderid in self.active_limit_orders:
-                self.active_limit_orders.pop(order.vt_orderid)
+            self.remove_limit_order(order.vt_orderid)
 
             # Push trade update
             self.trade_count += 1
@@ -686,7 +1665,13 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for stop_order in list(self.active_stop_orders.values()):
+        # Only visit stop orders can be triggered, in the same sequence as they were sent.
+        stop_orderids = self.stop_order_book.get_triggered(
+            self.vt_symbol, long_cross_price, short_cross_price
+        )
+        stop_orders = [self.stop_orders[stop_orderid] for stop_orderid in stop_orderids]
+
+        for stop_order in stop_orders:
             # Check whether stop order can be triggered.
             long_cross = (
                 stop_order.direction == Direction.LONG
@@ -751,6 +1736,7 @@ class BacktestingEngine:
 
             if stop_order.stop_orderid in self.active_stop_orders:
                 self.active_stop_orders.pop(stop_order.stop_orderid)
+            self.stop_order_book.remove(stop_order.stop_orderid)
 
             # Push update to strategy.
             self.strategy.on_stop_order(stop_order)
@@ -820,6 +1806,7 @@ class BacktestingEngine:
 
         self.active_stop_orders[stop_order.stop_orderid] = stop_order
         self.stop_orders[stop_order.stop_orderid] = stop_order
+        self.stop_order_book.add(stop_order)
 
         return stop_order.stop_orderid
 
@@ -849,8 +1836,26 @@ class BacktestingEngine:
         self.active_limit_orders[order.vt_orderid] = order
         self.limit_orders[order.vt_orderid] = order
 
+        self.submitting_limit_orders[order.vt_orderid] = self.limit_order_count
+
+        if direction == Direction.LONG:
+            self.long_limit_book.add(order.vt_orderid, price, self.limit_order_count)
+        else:
+            self.short_limit_book.add(order.vt_orderid, price, self.limit_order_count)
+
         return order.vt_orderid
 
+    def remove_limit_order(self, vt_orderid: str):
+        """
+        Remove limit order from active dict and price books.
+        """
+        if vt_orderid in self.active_limit_orders:
+            self.active_limit_orders.pop(vt_orderid)
+
+        self.submitting_limit_orders.pop(vt_orderid, None)
+        self.long_limit_book.remove(vt_orderid)
+        self.short_limit_book.remove(vt_orderid)
+
     def cancel_order(self, strategy: CtaTemplate, vt_orderid: str):
         """
         Cancel order by vt_orderid.
@@ -865,6 +1870,7 @@ class BacktestingEngine:
         if vt_orderid not in self.active_stop_orders:
             return
         stop_order = self.active_stop_orders.pop(vt_orderid)
+        self.stop_order_book.remove(vt_orderid)
 
         stop_order.status = StopOrderStatus.CANCELLED
         self.strategy.on_stop_order(stop_order)
@@ -873,7 +1879,8 @@ class BacktestingEngine:
         """"""
         if vt_orderid not in self.active_limit_orders:
             return
-        order = self.active_limit_orders.pop(vt_orderid)
+        order = self.active_limit_orders[vt_orderid]
+        self.remove_limit_order(vt_orderid)
 
         order.status = Status.CANCELLED
         self.strategy.on_order(order)
@@ -1040,6 +2047,174 @@ class DailyResult:
         self.net_pnl = self.total_pnl - self.commission - self.slippage
 
 
+def calculate_daily_pnl(
+    close_price: np.ndarray,
+    trade_ix: np.ndarray,
+    volume: np.ndarray,
+    price: np.ndarray,
+    long: np.ndarray,
+    size: float,
+    rate: float,
+    slippage: float,
+    inverse: bool
+) -> dict:
+    """
+    Vectorized version of DailyResult.calculate_pnl for all days.
+
+    Trades are given as arrays sorted by day index of trade_ix, and summed
+    into each day in original order, so the result is identical to
+    calculating day by day.
+    """
+    day_count = len(close_price)
+
+    # If no pre_close provided, use value 1 to avoid zero division error
+    pre_close = np.empty(day_count, dtype=close_price.dtype)
+    pre_close[0] = 0
+    pre_close[1:] = close_price[:-1]
+    pre_close[pre_close == 0] = 1
+
+    trade_count = np.bincount(trade_ix, minlength=day_count)
+    pos_change = np.where(long, volume, -volume)
+
+    # Position after each trade, start_pos/end_pos of each day
+    trade_pos = np.cumsum(pos_change)
+    last_ix = np.cumsum(trade_count) - 1
+
+    end_pos = np.zeros(day_count, dtype=trade_pos.dtype)
+    traded = last_ix >= 0
+    end_pos[traded] = trade_pos[last_ix[traded]]
+
+    start_pos = np.zeros(day_count, dtype=end_pos.dtype)
+    start_pos[1:] = end_pos[:-1]
+
+    # Holding pnl is the pnl from holding position at day start
+    trade_close = close_price[trade_ix]
+
+    if not inverse:     # For normal contract
+        holding_pnl = start_pos * (close_price - pre_close) * size
+
+        trade_turnover = volume * size * price
+        trade_pnl = pos_change * (trade_close - price) * size
+        trade_slippage = volume * size * slippage
+    else:               # For crypto currency inverse contract
+        holding_pnl = start_pos * (1 / pre_close - 1 / close_price) * size
+
+        trade_turnover = volume * size / price
+        trade_pnl = pos_change * (1 / price - 1 / trade_close) * size
+        trade_slippage = volume * size * slippage / (price ** 2)
+
+    trade_commission = trade_turnover * rate
+
+    # Trading pnl is the pnl from new trade during the day
+    turnover = sum_by_day(trade_ix, trade_turnover, day_count)
+    commission = sum_by_day(trade_ix, trade_commission, day_count)
+    slippage_cost = sum_by_day(trade_ix, trade_slippage, day_count)
+    trading_pnl = sum_by_day(trade_ix, trade_pnl, day_count)
+
+    # Net pnl takes account of commission and slippage cost
+    total_pnl = trading_pnl + holding_pnl
+    net_pnl = total_pnl - commission - slippage_cost
+
+    return {
+        "close_price": close_price,
+        "pre_close": pre_close,
+        "trade_count": trade_count,
+        "start_pos": start_pos,
+        "end_pos": end_pos,
+        "turnover": turnover,
+        "commission": commission,
+        "slippage": slippage_cost,
+        "trading_pnl": trading_pnl,
+        "holding_pnl": holding_pnl,
+        "total_pnl": total_pnl,
+        "net_pnl": net_pnl,
+    }
+
+
+def sum_by_day(trade_ix: np.ndarray, values: np.ndarray, day_count: int) -> np.ndarray:
+    """
+    Sum trade values into each day, accumulated in trade order.
+    """
+    result = np.zeros(day_count, dtype=values.dtype)
+    np.add.at(result, trade_ix, values)
+    return result
+
+
+def calculate_balance_statistics(
+    net_pnl: np.ndarray,
+    capital: float,
+    annual_days: int,
+    risk_free: float
+) -> dict:
+    """
+    Calculate balance, drawdown and return statistics from daily net pnl.
+    """
+    total_days = len(net_pnl)
+
+    # Calculate balance related time series data
+    balance = np.cumsum(net_pnl) + capital
+
+    # When balance falls below 0, set daily return to 0
+    pre_balance = np.empty(total_days)
+    pre_balance[0] = capital
+    pre_balance[1:] = balance[:-1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = balance / pre_balance
+    daily_returns = np.zeros(total_days)
+    positive = x > 0
+    daily_returns[positive] = np.log(x[positive])
+
+    highlevel = np.maximum.accumulate(balance)
+    drawdown = balance - highlevel
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ddpercent = drawdown / highlevel * 100
+
+    # Drawdown duration is from the last high before max drawdown
+    max_drawdown_end = drawdown.argmin()
+    max_drawdown_start = balance[:max_drawdown_end + 1].argmax()
+
+    end_balance = balance[-1]
+    max_ddpercent = np.nanmin(ddpercent)
+
+    total_return = (end_balance / capital - 1) * 100
+    annual_return = total_return / total_days * annual_days
+    daily_return = daily_returns.mean() * 100
+
+    if total_days > 1:
+        return_std = daily_returns.std(ddof=1) * 100
+    else:
+        return_std = np.nan
+
+    if return_std:
+        daily_risk_free = risk_free / np.sqrt(annual_days)
+        sharpe_ratio = (daily_return - daily_risk_free) / return_std * np.sqrt(annual_days)
+    else:
+        sharpe_ratio = 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_drawdown_ratio = -total_return / max_ddpercent
+
+    return {
+        "balance": balance,
+        "return": daily_returns,
+        "highlevel": highlevel,
+        "drawdown": drawdown,
+        "ddpercent": ddpercent,
+        "max_drawdown_start": max_drawdown_start,
+        "max_drawdown_end": max_drawdown_end,
+        "end_balance": end_balance,
+        "max_drawdown": drawdown[max_drawdown_end],
+        "max_ddpercent": max_ddpercent,
+        "total_return": total_return,
+        "annual_return": annual_return,
+        "daily_return": daily_return,
+        "return_std": return_std,
+        "sharpe_ratio": sharpe_ratio,
+        "return_drawdown_ratio": return_drawdown_ratio,
+    }
+
+
 @lru_cache(maxsize=999)
 def load_bar_data(
     symbol: str,
@@ -1071,6 +2246,43 @@ def load_tick_data(
     )
 
 
+@lru_cache(maxsize=999)
+def load_bar_array(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime
+) -> HistoryArray:
+    """
+    Load bar data and keep only its columnar copy in cache.
+    """
+    database = get_database()
+
+    bars = database.load_bar_data(
+        symbol, exchange, interval, start, end
+    )
+    return HistoryArray.from_data(BacktestingMode.BAR, bars)
+
+
+@lru_cache(maxsize=999)
+def load_tick_array(
+    symbol: str,
+    exchange: Exchange,
+    start: datetime,
+    end: datetime
+) -> HistoryArray:
+    """
+    Load tick data and keep only its columnar copy in cache.
+    """
+    database = get_database()
+
+    ticks = database.load_tick_data(
+        symbol, exchange, start, end
+    )
+    return HistoryArray.from_data(BacktestingMode.TICK, ticks)
+
+
 def evaluate(
     target_name: str,
     strategy_class: CtaTemplate,
@@ -1085,11 +2297,34 @@ def evaluate(
     end: datetime,
     mode: BacktestingMode,
     inverse: bool,
+    risk_free: float,
+    annual_days: int,
+    columnar: bool,
+    use_cache: bool,
+    streaming: bool,
+    precompute: bool,
+    shared_info: Optional[dict],
+    indicator_path: str,
+    result_cache: Optional[ResultCache],
+    daily_result: bool,
+    trading_start: Optional[datetime],
     setting: dict
 ):
     """
     Function for running in multiprocessing.pool
     """
+    # Daily result is not cached, so backtesting is always run for it
+    if daily_result:
+        result_cache = None
+
+    if result_cache:
+        statistics = result_cache.load(setting)
+        if statistics is not None:
+            return (str(setting), statistics[target_name], statistics)
+
+    if indicator_path:
+        set_indicator_path(indicator_path)
+
     engine = BacktestingEngine()
 
     engine.set_parameters(
@@ -1103,42 +2338,113 @@ def evaluate(
         capital=capital,
         end=end,
         mode=mode,
-        inverse=inverse
+        inverse=inverse,
+        risk_free=risk_free,
+        annual_days=annual_days,
+        columnar=columnar,
+        use_cache=use_cache,
+        streaming=streaming,
+        precompute=precompute
     )
 
+    engine.trading_start = trading_start
     engine.add_strategy(strategy_class, setting)
-    engine.load_data()
+
+    if shared_info:
+        engine.history_data = attach_shared_history(shared_info).between(start, end)
+    else:
+        engine.load_data()
+
     engine.run_backtesting()
-    engine.calculate_result()
+    df = engine.calculate_result()
     statistics = engine.calculate_statistics(output=False)
 
+    if result_cache:
+        result_cache.save(setting, statistics)
+
     target_value = statistics[target_name]
+
+    # Daily result is required for joining equity curve in walk-forward
+    if daily_result:
+        if df is not None:
+            df = df.drop(columns=["trades"])
+        return (str(setting), target_value, statistics, df)
+
     return (str(setting), target_value, statistics)
 
 
-def wrap_evaluate(engine: BacktestingEngine, target_name: str) -> callable:
+def wrap_evaluate(
+    engine: BacktestingEngine,
+    target_name: str,
+    shared_history: SharedHistory = None,
+    indicator_path: str = "",
+    result_cache: ResultCache = None,
+    start: datetime = None,
+    end: datetime = None,
+    daily_result: bool = False,
+    strategy_class: type = None,
+    trading_start: datetime = None
+) -> callable:
     """
     Wrap evaluate function with given setting from backtesting engine.
     """
+    if shared_history:
+        shared_info = shared_history.info
+    else:
+        shared_info = None
+
     func: callable = partial(
         evaluate,
         target_name,
-        engine.strategy_class,
+        strategy_class or engine.strategy_class,
         engine.vt_symbol,
         engine.interval,
-        engine.start,
+        start or engine.start,
         engine.rate,
         engine.slippage,
         engine.size,
         engine.pricetick,
         engine.capital,
-        engine.end,
+        end or engine.end,
         engine.mode,
-        engine.inverse
+        engine.inverse,
+        engine.risk_free,
+        engine.annual_days,
+        engine.columnar,
+        engine.use_cache,
+        engine.streaming,
+        engine.precompute,
+        shared_info,
+        indicator_path,
+        result_cache,
+        daily_result,
+        trading_start
     )
     return func
 
 
+def get_history_dates(data: list) -> List[date]:
+    """
+    Get sorted dates of history data.
+    """
+    if isinstance(data, HistoryArray):
+        index = to_datetime(data.datetime_array, unit="us", utc=bool(data.tzinfo))
+        if data.tzinfo:
+            index = index.tz_convert(data.tzinfo)
+        return sorted(set(index.date))
+
+    return sorted({d.datetime.date() for d in data})
+
+
+def create_empty_daily_df(dates: Index) -> DataFrame:
+    """
+    Create daily result DataFrame of dates without any trade, trades
+    column is not included the same as evaluate.
+    """
+    columns = [key for key in DailyResult(None, 0).__dict__.keys() if key not in {"date", "trades"}]
+    return DataFrame(0.0, index=dates, columns=columns)
+
+
 def get_target_value(result: list) -> float:
     """
     Get target value for sorting optimization results.
@@ -46,7 +46,9 @@ class StopOrder:
 
 EVENT_CTA_LOG = "eCtaLog"
 EVENT_CTA_STRATEGY = "eCtaStrategy"
+EVENT_CTA_STRATEGY_CHANGE = "eCtaStrategyChange"
 EVENT_CTA_STOPORDER = "eCtaStopOrder"
+EVENT_CTA_INIT = "eCtaInit"
 
 INTERVAL_DELTA_MAP = {
     Interval.TICK: timedelta(milliseconds=1),
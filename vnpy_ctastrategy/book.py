@@ -0,0 +1,159 @@
+"""
+Price sorted order index used for fast order matching.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Tuple
+
+from vnpy.trader.constant import Direction
+
+from .base import StopOrder
+
+
+class PriceBook:
+    """
+    Orders sorted by price, so that only crossed orders need to be visited.
+
+    Each order is stored with a sequence number given by caller, which
+    is used to restore the original sending order of crossed orders.
+    """
+
+    def __init__(self):
+        """"""
+        self.entries: List[Tuple[float, int, str]] = []
+        self.keys: Dict[str, Tuple[float, int, str]] = {}
+
+    def add(self, orderid: str, price: float, seq: int) -> None:
+        """
+        Add a new order into book.
+        """
+        entry = (price, seq, orderid)
+        insort(self.entries, entry)
+        self.keys[orderid] = entry
+
+    def remove(self, orderid: str) -> None:
+        """
+        Remove an order from book, do nothing if not found.
+        """
+        entry = self.keys.pop(orderid, None)
+        if not entry:
+            return
+
+        ix = bisect_left(self.entries, entry)
+        del self.entries[ix]
+
+    def get_above(self, price: float) -> List[Tuple[int, str]]:
+        """
+        Get (seq, orderid) of orders with price higher than or equal to given price.
+        """
+        ix = bisect_left(self.entries, (price,))
+        return [(seq, orderid) for _, seq, orderid in self.entries[ix:]]
+
+    def get_below(self, price: float) -> List[Tuple[int, str]]:
+        """
+        Get (seq, orderid) of orders with price lower than or equal to given price.
+        """
+        ix = bisect_right(self.entries, (price, float("inf")))
+        return [(seq, orderid) for _, seq, orderid in self.entries[:ix]]
+
+    def clear(self) -> None:
+        """"""
+        self.entries.clear()
+        self.keys.clear()
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.entries)
+
+    def __contains__(self, orderid: str) -> bool:
+        """"""
+        return orderid in self.keys
+
+
+class StopOrderBook:
+    """
+    Active stop orders indexed by vt_symbol and direction, used by both
+    backtesting and live engine to find triggered stop orders.
+    """
+
+    def __init__(self):
+        """"""
+        self.long_books: Dict[str, PriceBook] = {}
+        self.short_books: Dict[str, PriceBook] = {}
+        self.order_books: Dict[str, PriceBook] = {}
+        self.count: int = 0
+
+    def add(self, stop_order: StopOrder) -> None:
+        """
+        Add a new active stop order.
+        """
+        if stop_order.direction == Direction.LONG:
+            books = self.long_books
+        elif stop_order.direction == Direction.SHORT:
+            books = self.short_books
+        else:
+            return
+
+        book = books.get(stop_order.vt_symbol, None)
+        if book is None:
+            book = PriceBook()
+            books[stop_order.vt_symbol] = book
+
+        self.count += 1
+        book.add(stop_order.stop_orderid, stop_order.price, self.count)
+        self.order_books[stop_order.stop_orderid] = book
+
+    def remove(self, stop_orderid: str) -> None:
+        """
+        Remove a stop order after triggered or cancelled.
+        """
+        book = self.order_books.pop(stop_orderid, None)
+        if book is not None:
+            book.remove(stop_orderid)
+
+    def get_triggered(
+        self,
+        vt_symbol: str,
+        long_price: float,
+        short_price: float
+    ) -> List[str]:
+        """
+        Get stop_orderids of triggered stop orders in sending sequence.
+
+        Long stop order is triggered when its price <= long_price, and
+        short stop order is triggered when its price >= short_price.
+        """
+        triggered = []
+
+        long_book = self.long_books.get(vt_symbol, None)
+        if long_book:
+            triggered.extend(long_book.get_below(long_price))
+
+        short_book = self.short_books.get(vt_symbol, None)
+        if short_book:
+            triggered.extend(short_book.get_above(short_price))
+
+        triggered.sort()
+        return [stop_orderid for _, stop_orderid in triggered]
+
+    def has_symbol(self, vt_symbol: str) -> bool:
+        """
+        Check if there is any active stop order of vt_symbol.
+        """
+        long_book = self.long_books.get(vt_symbol, None)
+        short_book = self.short_books.get(vt_symbol, None)
+        return bool(long_book) or bool(short_book)
+
+    def clear(self) -> None:
+        """"""
+        self.long_books.clear()
+        self.short_books.clear()
+        self.order_books.clear()
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.order_books)
+
+    def __contains__(self, stop_orderid: str) -> bool:
+        """"""
+        return stop_orderid in self.order_books
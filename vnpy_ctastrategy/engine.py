@@ -2,12 +2,15 @@
 
 import importlib
 import traceback
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, Callable, List
+from time import time
+from typing import Any, Callable, List, Optional, Tuple
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
 from copy import copy
+from threading import Lock
 from tzlocal import get_localzone
 from glob import glob
 
@@ -26,7 +29,8 @@ from vnpy.trader.event import (
     EVENT_TICK,
     EVENT_ORDER,
     EVENT_TRADE,
-    EVENT_POSITION
+    EVENT_POSITION,
+    EVENT_TIMER
 )
 from vnpy.trader.constant import (
     Direction,
@@ -38,19 +42,24 @@ from vnpy.trader.constant import (
 )
 from vnpy.trader.utility import load_json, save_json, extract_vt_symbol, round_to
 from vnpy.trader.converter import OffsetConverter
-from vnpy.trader.database import BaseDatabase, get_database
+from vnpy.trader.database import BaseDatabase, get_database, DB_TZ
 from vnpy.trader.datafeed import BaseDatafeed, get_datafeed
 
 from .base import (
     APP_NAME,
     EVENT_CTA_LOG,
     EVENT_CTA_STRATEGY,
+    EVENT_CTA_STRATEGY_CHANGE,
     EVENT_CTA_STOPORDER,
+    EVENT_CTA_INIT,
     EngineType,
     StopOrder,
     StopOrderStatus,
-    STOPORDER_PREFIX
+    STOPORDER_PREFIX,
+    INTERVAL_DELTA_MAP
 )
+from .book import StopOrderBook
+from .persistence import StrategyDataWriter
 from .template import CtaTemplate
 
 
@@ -74,6 +83,9 @@ class CtaEngine(BaseEngine):
     setting_filename = "cta_strategy_setting.json"
     data_filename = "cta_strategy_data.json"
 
+    strategy_event_interval = 0.2   # min seconds between strategy events
+    init_workers = 1                # threads for running strategy on_init
+
     def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
         """"""
         super(CtaEngine, self).__init__(
@@ -81,6 +93,8 @@ class CtaEngine(BaseEngine):
 
         self.strategy_setting = {}  # strategy_name: dict
         self.strategy_data = {}     # strategy_name: dict
+        self.data_writer = StrategyDataWriter(
+            self.data_filename, write_log=self.write_log)
 
         self.classes = {}           # class_name: stategy_class
         self.strategies = {}        # strategy_name: strategy
@@ -93,14 +107,33 @@ class CtaEngine(BaseEngine):
 
         self.stop_order_count = 0   # for generating stop_orderid
         self.stop_orders = {}       # stop_orderid: stop_order
-
-        self.init_executor = ThreadPoolExecutor(max_workers=1)
+        self.stop_order_book = StopOrderBook()
+
+        self.init_executor = ThreadPoolExecutor(max_workers=self.init_workers)
+        self.init_locks = {}            # vt_symbol: lock for init one by one
+        self.init_lock = Lock()         # for init status shared with init pool
+        self.initing_strategies = set()     # strategy_name
+        self.init_submitted = 0         # for init progress
+        self.init_finished = 0
+        self.init_batch_start = 0
+        self.init_batch_time = 0
+
+        self.bar_cache = {}         # (vt_symbol, interval, use_database): [start, end, bars]
+        self.bar_cache_locks = {}   # (vt_symbol, interval, use_database): lock
+        self.bar_cache_lock = Lock()    # for bar cache and its locks
+        self.bar_overviews = None   # (symbol, exchange, interval): (start, end)
+        self.query_lock = Lock()    # for querying history data one by one
 
         self.rq_client = None
         self.rq_symbols = set()
 
         self.vt_tradeids = set()    # for filtering duplicate trade
 
+        self.strategy_event_times = {}      # strategy_name: last put time
+        self.strategy_event_data = {}       # strategy_name: last put data
+        self.pending_strategy_events = set()    # throttled strategy_name
+        self.strategy_event_lock = Lock()
+
         self.offset_converter = OffsetConverter(self.main_engine)
 
         self.database: BaseDatabase = get_database()
@@ -119,6 +152,7 @@ class CtaEngine(BaseEngine):
     def close(self):
         """"""
         self.stop_all_strategies()
+        self.data_writer.close()
 
     def register_event(self):
         """"""
@@ -126,6 +160,8 @@ class CtaEngine(BaseEngine):
         self.event_engine.register(EVENT_ORDER, self.process_order_event)
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
         self.event_engine.register(EVENT_POSITION, self.process_position_event)
+        self.event_engine.register(EVENT_TIMER, self.process_timer_event)
+        self.event_engine.register(EVENT_CTA_INIT, self.process_init_event)
 
     def init_datafeed(self):
         """
@@ -159,7 +195,9 @@ class CtaEngine(BaseEngine):
         if not strategies:
             return
 
-        self.check_stop_order(tick)
+        # Only check stop orders when there is any for this symbol
+        if self.stop_order_book.has_symbol(tick.vt_symbol):
+            self.check_stop_order(tick)
 
         for strategy in strategies:
             if strategy.inited:
@@ -234,12 +272,30 @@ class CtaEngine(BaseEngine):
 
         self.offset_converter.update_position(position)
 
+    def process_timer_event(self, event: Event):
+        """
+        Put strategy events throttled before.
+        """
+        if not self.pending_strategy_events:
+            return
+
+        with self.strategy_event_lock:
+            strategy_names = list(self.pending_strategy_events)
+            self.pending_strategy_events.clear()
+
+        for strategy_name in strategy_names:
+            strategy = self.strategies.get(strategy_name, None)
+            if strategy:
+                self.put_strategy_event(strategy, force=True)
+
     def check_stop_order(self, tick: TickData):
         """"""
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
-                continue
+        stop_orderids = self.stop_order_book.get_triggered(
+            tick.vt_symbol, tick.last_price, tick.last_price
+        )
+        stop_orders = [self.stop_orders[stop_orderid] for stop_orderid in stop_orderids]
 
+        for stop_order in stop_orders:
             long_triggered = (
                 stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
             )
@@ -281,6 +337,7 @@ class CtaEngine(BaseEngine):
                 if vt_orderids:
                     # Remove from relation map.
                     self.stop_orders.pop(stop_order.stop_orderid)
+                    self.stop_order_book.remove(stop_order.stop_orderid)
 
                     strategy_vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
                     if stop_order.stop_orderid in strategy_vt_orderids:
@@ -430,6 +487,7 @@ class CtaEngine(BaseEngine):
         )
 
         self.stop_orders[stop_orderid] = stop_order
+        self.stop_order_book.add(stop_order)
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         vt_orderids.add(stop_orderid)
@@ -462,6 +520,7 @@ class CtaEngine(BaseEngine):
 
         # Remove from relation map.
         self.stop_orders.pop(stop_orderid)
+        self.stop_order_book.remove(stop_orderid)
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         if stop_orderid in vt_orderids:
@@ -551,33 +610,167 @@ class CtaEngine(BaseEngine):
         callback: Callable[[BarData], None],
         use_database: bool
     ) -> List[BarData]:
-        """"""
-        symbol, exchange = extract_vt_symbol(vt_symbol)
+        """
+        Load bar data for strategy warm-up.
+
+        During strategy init, bars are cached by (vt_symbol, interval,
+        use_database) and shared by strategies of the same contract, only
+        the range not yet cached is queried. The cache is released after
+        all strategies inited.
+        """
         end = datetime.now(LOCAL_TZ)
         start = end - timedelta(days)
-        bars = []
 
-        # Pass gateway and datafeed if use_database set to True
-        if not use_database:
-            # Query bars from gateway if available
-            contract = self.main_engine.get_contract(vt_symbol)
+        # Bars loaded after init (e.g. in on_timer) are not cached
+        with self.bar_cache_lock:
+            if not self.initing_strategies:
+                lock = None
+            else:
+                # Requests with the same key are served one by one, so that
+                # the later ones can use data loaded by the first one.
+                key = (vt_symbol, interval, use_database)
+                lock = self.bar_cache_locks.setdefault(key, Lock())
+
+        if not lock:
+            return self.query_bar(vt_symbol, interval, start, end, use_database)
+
+        with lock:
+            cache = self.bar_cache.get(key, None)
+
+            if not cache:
+                bars = self.query_bar(vt_symbol, interval, start, end, use_database)
+                cache = [start, end, bars]
+            else:
+                cache_start, cache_end, bars = cache
+
+                # Load older bars before cached range
+                if start < cache_start:
+                    head = self.query_bar(vt_symbol, interval, start, cache_start, use_database)
+                    if bars:
+                        head = [bar for bar in head if bar.datetime < bars[0].datetime]
+                    bars = head + bars
+                    cache_start = start
+
+                # Load new bars generated after last query, intervals not
+                # in the map (e.g. weekly) are always queried again.
+                interval_delta = INTERVAL_DELTA_MAP.get(interval, timedelta())
+                if end - cache_end >= interval_delta:
+                    # Last cached bar may be still forming, query it again
+                    if bars:
+                        tail_start = bars[-1].datetime
+                    else:
+                        tail_start = cache_end
+
+                    tail = self.query_bar(vt_symbol, interval, tail_start, end, use_database)
+                    if tail:
+                        bars = [bar for bar in bars if bar.datetime < tail[0].datetime] + tail
+                    cache_end = end
+
+                cache = [cache_start, cache_end, bars]
+
+            with self.bar_cache_lock:
+                self.bar_cache[key] = cache
+
+        datetimes = [to_local(bar.datetime) for bar in bars]
+        ix_start = bisect_left(datetimes, start)
+        ix_end = bisect_right(datetimes, end)
+        return bars[ix_start:ix_end]
+
+    def release_bar_cache(self):
+        """
+        Release warm-up bars after all strategies inited.
+        """
+        with self.bar_cache_lock:
+            if not self.initing_strategies:
+                self.bar_cache.clear()
+                self.bar_cache_locks.clear()
+
+    def query_bar(
+        self,
+        vt_symbol: str,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        use_database: bool
+    ) -> List[BarData]:
+        """
+        Query bar data from gateway, datafeed or database.
+
+        Bars already saved in database are loaded locally, only bars before
+        the first and after the last saved one are queried from gateway or
+        datafeed, and then saved into database for next time.
+        """
+        # Datafeed and database may not be thread-safe, so queries from
+        # init pool are run one by one.
+        with self.query_lock:
+            symbol, exchange = extract_vt_symbol(vt_symbol)
 
-            if contract and contract.history_data:
-                req = HistoryRequest(
+            # Pass gateway and datafeed if use_database set to True
+            if use_database:
+                return self.database.load_bar_data(
                     symbol=symbol,
                     exchange=exchange,
                     interval=interval,
                     start=start,
-                    end=end
+                    end=end,
                 )
-                bars = self.main_engine.query_history(req, contract.gateway_name)
 
-            # Try to query bars from datafeed, if not found, load from database.
-            else:
-                bars = self.query_bar_from_datafeed(symbol, exchange, interval, start, end)
+            interval_delta = INTERVAL_DELTA_MAP.get(interval, timedelta(weeks=1))
 
-        if not bars:
-            bars = self.database.load_bar_data(
+            # Load local bars if database has data within the range
+            local_bars = []
+
+            overview = self.get_bar_overview(symbol, exchange, interval)
+            if overview and overview[0] <= end and overview[1] >= start:
+                local_bars = self.database.load_bar_data(
+                    symbol=symbol,
+                    exchange=exchange,
+                    interval=interval,
+                    start=start,
+                    end=end,
+                )
+
+            # Query the missing bars from gateway or datafeed
+            if not local_bars:
+                head_bars = []
+                tail_bars = self.query_bar_from_remote(vt_symbol, interval, start, end)
+            else:
+                first_dt = local_bars[0].datetime
+                last_dt = local_bars[-1].datetime
+
+                # First saved bar may be up to one interval after start
+                head_bars = []
+                if overview[0] > start + interval_delta:
+                    head_bars = self.query_bar_from_remote(vt_symbol, interval, start, first_dt)
+                    head_bars = [bar for bar in head_bars if bar.datetime < first_dt]
+
+                tail_bars = self.query_bar_from_remote(vt_symbol, interval, last_dt, end)
+                tail_bars = [bar for bar in tail_bars if bar.datetime > last_dt]
+
+            remote_bars = head_bars + tail_bars
+
+            if remote_bars:
+                # The last bar from gateway may be still forming, only closed
+                # bars are saved, or it will never be corrected by later query.
+                now = datetime.now(LOCAL_TZ)
+                closed_bars = [bar for bar in remote_bars if bar.datetime + interval_delta <= now]
+
+                # Save copies since bar data is changed by database when saving
+                try:
+                    if closed_bars:
+                        self.database.save_bar_data([copy(bar) for bar in closed_bars])
+                        self.update_bar_overview(symbol, exchange, interval, closed_bars)
+                except Exception:
+                    msg = f"K线数据保存失败，触发异常：\n{traceback.format_exc()}"
+                    self.write_log(msg)
+
+                return head_bars + local_bars + tail_bars
+
+            if local_bars:
+                return local_bars
+
+            # If not found from remote, load from database.
+            return self.database.load_bar_data(
                 symbol=symbol,
                 exchange=exchange,
                 interval=interval,
@@ -585,8 +778,88 @@ class CtaEngine(BaseEngine):
                 end=end,
             )
 
+    def query_bar_from_remote(
+        self,
+        vt_symbol: str,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> List[BarData]:
+        """
+        Query bar data from gateway if available, otherwise from datafeed.
+        """
+        symbol, exchange = extract_vt_symbol(vt_symbol)
+        contract = self.main_engine.get_contract(vt_symbol)
+
+        if contract and contract.history_data:
+            req = HistoryRequest(
+                symbol=symbol,
+                exchange=exchange,
+                interval=interval,
+                start=start,
+                end=end
+            )
+            bars = self.main_engine.query_history(req, contract.gateway_name)
+        else:
+            bars = self.query_bar_from_datafeed(symbol, exchange, interval, start, end)
+
+        if not bars:
+            return []
+
+        # Some gateways return naive datetime in local time
+        for bar in bars:
+            if not bar.datetime.tzinfo:
+                bar.datetime = to_local(bar.datetime)
+
         return bars
 
+    def get_bar_overview(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Get start and end datetime of bar data saved in database.
+
+        Overviews of database are only queried once, and then updated with
+        bars saved by this engine.
+        """
+        if self.bar_overviews is None:
+            bar_overviews = {}
+
+            for overview in self.database.get_bar_overview():
+                # Convert in the same way as bar data loaded from database
+                key = (overview.symbol, overview.exchange, overview.interval)
+                bar_overviews[key] = (
+                    datetime.fromtimestamp(overview.start.timestamp(), DB_TZ),
+                    datetime.fromtimestamp(overview.end.timestamp(), DB_TZ)
+                )
+
+            self.bar_overviews = bar_overviews
+
+        return self.bar_overviews.get((symbol, exchange, interval), None)
+
+    def update_bar_overview(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        bars: List[BarData]
+    ) -> None:
+        """
+        Extend overview with bars saved into database.
+        """
+        start = bars[0].datetime
+        end = bars[-1].datetime
+
+        overview = self.get_bar_overview(symbol, exchange, interval)
+        if overview:
+            start = min(start, overview[0])
+            end = max(end, overview[1])
+
+        self.bar_overviews[(symbol, exchange, interval)] = (start, end)
+
     def load_tick(
         self,
         vt_symbol: str,
@@ -598,12 +871,13 @@ class CtaEngine(BaseEngine):
         end = datetime.now(LOCAL_TZ)
         start = end - timedelta(days)
 
-        ticks = self.database.load_tick_data(
-            symbol=symbol,
-            exchange=exchange,
-            start=start,
-            end=end,
-        )
+        with self.query_lock:
+            ticks = self.database.load_tick_data(
+                symbol=symbol,
+                exchange=exchange,
+                start=start,
+                end=end,
+            )
 
         return ticks
 
@@ -663,13 +937,75 @@ class CtaEngine(BaseEngine):
 
     def init_strategy(self, strategy_name: str):
         """
-        Init a strategy.
+        Init a strategy in init pool.
+        """
+        strategy = self.strategies[strategy_name]
+
+        if strategy.inited:
+            self.write_log(f"{strategy_name}已经完成初始化，禁止重复操作")
+            return
+
+        with self.init_lock:
+            if strategy_name in self.initing_strategies:
+                self.write_log(f"{strategy_name}正在初始化，禁止重复操作")
+                return
+            self.initing_strategies.add(strategy_name)
+
+            # Start a new batch for progress if all submitted ones finished
+            if self.init_finished == self.init_submitted:
+                self.init_batch_start = self.init_submitted
+                self.init_batch_time = time()
+            self.init_submitted += 1
+
+        self.init_executor.submit(self.run_strategy_init, strategy_name)
+
+    def run_strategy_init(self, strategy_name: str):
+        """
+        Call on_init of strategy in init pool thread, result is applied
+        later in event engine thread.
+        """
+        strategy = self.strategies[strategy_name]
+
+        self.write_log(f"{strategy_name}开始执行初始化")
+
+        # Strategies of the same contract are inited one by one
+        with self.init_lock:
+            lock = self.init_locks.setdefault(strategy.vt_symbol, Lock())
+
+        with lock:
+            self.call_strategy_func(strategy, strategy.on_init)
+
+        event = Event(EVENT_CTA_INIT, strategy_name)
+        self.event_engine.put(event)
+
+    def process_init_event(self, event: Event):
+        """
+        Finish strategy init and output progress.
         """
-        self.init_executor.submit(self._init_strategy, strategy_name)
+        strategy_name = event.data
+
+        with self.init_lock:
+            self.initing_strategies.discard(strategy_name)
+
+            self.init_finished += 1
+            total = self.init_submitted - self.init_batch_start
+            finished = self.init_finished - self.init_batch_start
+
+        strategy = self.strategies.get(strategy_name, None)
+        if strategy and not strategy.inited:
+            self.finish_strategy_init(strategy)
+
+        if total > 1:
+            cost = time() - self.init_batch_time
+            left = cost / finished * (total - finished)
+            self.write_log(f"策略初始化进度：{finished}/{total}，耗时{cost:.1f}秒，预计剩余{left:.1f}秒")
+
+        # Release warm-up data after all strategies inited
+        self.release_bar_cache()
 
     def _init_strategy(self, strategy_name: str):
         """
-        Init strategies in queue.
+        Init a strategy immediately in caller thread.
         """
         strategy = self.strategies[strategy_name]
 
@@ -677,11 +1013,29 @@ class CtaEngine(BaseEngine):
             self.write_log(f"{strategy_name}已经完成初始化，禁止重复操作")
             return
 
+        with self.init_lock:
+            if strategy_name in self.initing_strategies:
+                self.write_log(f"{strategy_name}正在初始化，禁止重复操作")
+                return
+            self.initing_strategies.add(strategy_name)
+
         self.write_log(f"{strategy_name}开始执行初始化")
 
         # Call on_init function of strategy
         self.call_strategy_func(strategy, strategy.on_init)
 
+        with self.init_lock:
+            self.initing_strategies.discard(strategy_name)
+        self.release_bar_cache()
+
+        self.finish_strategy_init(strategy)
+
+    def finish_strategy_init(self, strategy: CtaTemplate):
+        """
+        Restore variables and subscribe market data after on_init called.
+        """
+        strategy_name = strategy.strategy_name
+
         # Restore strategy data(variables)
         data = self.strategy_data.get(strategy_name, None)
         if data:
@@ -701,7 +1055,7 @@ class CtaEngine(BaseEngine):
 
         # Put event to update init completed status.
         strategy.inited = True
-        self.put_strategy_event(strategy)
+        self.put_strategy_event(strategy, force=True)
         self.write_log(f"{strategy_name}初始化完成")
 
     def start_strategy(self, strategy_name: str):
@@ -720,7 +1074,7 @@ class CtaEngine(BaseEngine):
         self.call_strategy_func(strategy, strategy.on_start)
         strategy.trading = True
 
-        self.put_strategy_event(strategy)
+        self.put_strategy_event(strategy, force=True)
 
     def stop_strategy(self, strategy_name: str):
         """
@@ -743,7 +1097,7 @@ class CtaEngine(BaseEngine):
         self.sync_strategy_data(strategy)
 
         # Update GUI
-        self.put_strategy_event(strategy)
+        self.put_strategy_event(strategy, force=True)
 
     def edit_strategy(self, strategy_name: str, setting: dict):
         """
@@ -753,7 +1107,7 @@ class CtaEngine(BaseEngine):
         strategy.update_setting(setting)
 
         self.update_strategy_setting(strategy_name, setting)
-        self.put_strategy_event(strategy)
+        self.put_strategy_event(strategy, force=True)
 
     def remove_strategy(self, strategy_name: str):
         """
@@ -783,6 +1137,12 @@ class CtaEngine(BaseEngine):
         # Remove from strategies
         self.strategies.pop(strategy_name)
 
+        # Remove strategy event status
+        with self.strategy_event_lock:
+            self.strategy_event_times.pop(strategy_name, None)
+            self.strategy_event_data.pop(strategy_name, None)
+            self.pending_strategy_events.discard(strategy_name)
+
         self.write_log(f"策略{strategy.strategy_name}移除移除成功")
         return True
 
@@ -827,20 +1187,23 @@ class CtaEngine(BaseEngine):
 
     def load_strategy_data(self):
         """
-        Load strategy data from json file.
+        Load strategy data from json file and journal.
         """
-        self.strategy_data = load_json(self.data_filename)
+        self.strategy_data = self.data_writer.load()
+        self.data_writer.start()
 
     def sync_strategy_data(self, strategy: CtaTemplate):
         """
         Sync strategy data into json file.
+
+        File is written by data writer in background thread.
         """
         data = strategy.get_variables()
         data.pop("inited")      # Strategy status (inited, trading) should not be synced.
         data.pop("trading")
 
         self.strategy_data[strategy.strategy_name] = data
-        save_json(self.data_filename, self.strategy_data)
+        self.data_writer.update(strategy.strategy_name, data)
 
     def get_all_strategy_class_names(self):
         """
@@ -929,14 +1292,55 @@ class CtaEngine(BaseEngine):
         event = Event(EVENT_CTA_STOPORDER, stop_order)
         self.event_engine.put(event)
 
-    def put_strategy_event(self, strategy: CtaTemplate):
+    def put_strategy_event(self, strategy: CtaTemplate, force: bool = False):
         """
         Put an event to update strategy status.
+
+        Events of each strategy are throttled by strategy_event_interval,
+        the throttled one is put later by timer, and the one without any
+        change is skipped. EVENT_CTA_STRATEGY always has full data, and
+        parameters and variables changed since last event are also put
+        with EVENT_CTA_STRATEGY_CHANGE.
         """
-        data = strategy.get_data()
+        strategy_name = strategy.strategy_name
+
+        # Strategy event may be put from init pool thread
+        with self.strategy_event_lock:
+            now = time()
+            if not force:
+                last_time = self.strategy_event_times.get(strategy_name, 0)
+                if now - last_time < self.strategy_event_interval:
+                    self.pending_strategy_events.add(strategy_name)
+                    return
+
+            self.strategy_event_times[strategy_name] = now
+            self.pending_strategy_events.discard(strategy_name)
+
+            data = strategy.get_data()
+
+            last_data = self.strategy_event_data.get(strategy_name, None)
+            self.strategy_event_data[strategy_name] = {
+                "parameters": {k: copy(v) for k, v in data["parameters"].items()},
+                "variables": {k: copy(v) for k, v in data["variables"].items()},
+            }
+
+        if last_data:
+            changed_data = {
+                "strategy_name": strategy_name,
+                "parameters": get_changed_data(data["parameters"], last_data["parameters"]),
+                "variables": get_changed_data(data["variables"], last_data["variables"]),
+            }
+
+            if not changed_data["parameters"] and not changed_data["variables"]:
+                return
+
         event = Event(EVENT_CTA_STRATEGY, data)
         self.event_engine.put(event)
 
+        if last_data:
+            event = Event(EVENT_CTA_STRATEGY_CHANGE, changed_data)
+            self.event_engine.put(event)
+
     def write_log(self, msg: str, strategy: CtaTemplate = None):
         """
         Create cta engine log event.
@@ -958,3 +1362,23 @@ class CtaEngine(BaseEngine):
             subject = "CTA策略引擎"
 
         self.main_engine.send_email(subject, msg)
+
+
+def to_local(dt: datetime) -> datetime:
+    """
+    Convert datetime into LOCAL_TZ, naive datetime is treated as local time.
+    """
+    return dt.astimezone(LOCAL_TZ)
+
+
+def get_changed_data(data: dict, last_data: dict) -> dict:
+    """
+    Get items in data which are different from last data.
+    """
+    changed = {}
+
+    for name, value in data.items():
+        if name not in last_data or last_data[name] != value:
+            changed[name] = value
+
+    return changed
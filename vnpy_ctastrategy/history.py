@@ -0,0 +1,561 @@
+"""
+Columnar storage of history data used in backtesting.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:     # Python 3.7
+    shared_memory = None
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.database import DB_TZ
+from vnpy.trader.object import BarData, TickData
+from vnpy.trader.utility import ArrayManager, get_folder_path
+
+from .base import BacktestingMode, INTERVAL_DELTA_MAP
+
+
+BAR_FIELDS = [
+    "volume",
+    "turnover",
+    "open_interest",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+]
+
+TICK_FIELDS = [
+    "volume",
+    "turnover",
+    "open_interest",
+    "last_price",
+    "last_volume",
+    "limit_up",
+    "limit_down",
+    "open_price",
+    "high_price",
+    "low_price",
+    "pre_close",
+]
+for n in range(1, 6):
+    TICK_FIELDS.append(f"bid_price_{n}")
+    TICK_FIELDS.append(f"ask_price_{n}")
+    TICK_FIELDS.append(f"bid_volume_{n}")
+    TICK_FIELDS.append(f"ask_volume_{n}")
+
+MODE_FIELDS_MAP = {
+    BacktestingMode.BAR: BAR_FIELDS,
+    BacktestingMode.TICK: TICK_FIELDS,
+}
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class HistoryArray(Sequence):
+    """
+    Struct-of-arrays container for bar or tick history.
+
+    Datetime is stored as int64 microseconds since epoch and every
+    numeric field as a float64 column. BarData/TickData objects are
+    only created when an element is accessed.
+    """
+
+    def __init__(
+        self,
+        mode: BacktestingMode,
+        columns: Dict[str, np.ndarray],
+        symbol: str = "",
+        exchange: Exchange = None,
+        interval: Interval = None,
+        name: str = "",
+        gateway_name: str = "",
+        tzinfo=None
+    ):
+        """"""
+        self.mode = mode
+        self.columns = columns
+
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.name = name
+        self.gateway_name = gateway_name
+        self.tzinfo = tzinfo
+
+        self.datetime_array = columns["datetime"]
+        self.fingerprint: str = ""
+
+    @classmethod
+    def from_data(cls, mode: BacktestingMode, data: list) -> "HistoryArray":
+        """
+        Convert a list of BarData/TickData into columnar arrays.
+        """
+        fields = MODE_FIELDS_MAP[mode]
+        size = len(data)
+
+        columns = {"datetime": np.empty(size, dtype=np.int64)}
+        for field in fields:
+            columns[field] = np.empty(size, dtype=np.float64)
+
+        if not data:
+            return cls(mode, columns)
+
+        first = data[0]
+        tzinfo = first.datetime.tzinfo
+        epoch = EPOCH_UTC if tzinfo else EPOCH
+
+        columns["datetime"][:] = [(d.datetime - epoch) // MICROSECOND for d in data]
+        for field in fields:
+            columns[field][:] = [getattr(d, field) for d in data]
+
+        return cls(
+            mode,
+            columns,
+            symbol=first.symbol,
+            exchange=first.exchange,
+            interval=getattr(first, "interval", None),
+            name=getattr(first, "name", ""),
+            gateway_name=first.gateway_name,
+            tzinfo=tzinfo
+        )
+
+    @classmethod
+    def concat(cls, mode: BacktestingMode, arrays: List["HistoryArray"]) -> "HistoryArray":
+        """
+        Join several arrays (e.g. loaded chunk by chunk) into one.
+        """
+        arrays = [a for a in arrays if len(a)]
+        if not arrays:
+            return cls.from_data(mode, [])
+
+        first = arrays[0]
+        if len(arrays) == 1:
+            return first
+
+        columns = {}
+        for key in first.columns.keys():
+            columns[key] = np.concatenate([a.columns[key] for a in arrays])
+
+        return first.new(columns)
+
+    def new(self, columns: Dict[str, np.ndarray]) -> "HistoryArray":
+        """
+        Create a new array sharing meta data with this one.
+        """
+        return HistoryArray(
+            self.mode,
+            columns,
+            symbol=self.symbol,
+            exchange=self.exchange,
+            interval=self.interval,
+            name=self.name,
+            gateway_name=self.gateway_name,
+            tzinfo=self.tzinfo
+        )
+
+    def get_datetime(self, ix: int) -> datetime:
+        """
+        Get datetime of element at ix without creating the data object.
+        """
+        microseconds = int(self.datetime_array[ix])
+
+        if self.tzinfo:
+            return (EPOCH_UTC + timedelta(microseconds=microseconds)).astimezone(self.tzinfo)
+        else:
+            return EPOCH + timedelta(microseconds=microseconds)
+
+    def to_microseconds(self, dt: datetime) -> int:
+        """
+        Convert datetime into the integer format of datetime array.
+
+        Naive datetime is treated as DB_TZ time, the same as database query.
+        """
+        if self.tzinfo:
+            return (to_utc(dt) - EPOCH_UTC) // MICROSECOND
+        else:
+            return (from_utc(to_utc(dt)) - EPOCH) // MICROSECOND
+
+    def between(self, start: datetime = None, end: datetime = None) -> "HistoryArray":
+        """
+        Get a view of data with datetime within [start, end].
+        """
+        ix_start = 0
+        ix_end = len(self)
+
+        if start:
+            ix_start = np.searchsorted(self.datetime_array, self.to_microseconds(start), side="left")
+        if end:
+            ix_end = np.searchsorted(self.datetime_array, self.to_microseconds(end), side="right")
+
+        return self[ix_start:ix_end]
+
+    def get_meta(self) -> dict:
+        """
+        Get meta data in json serializable format.
+        """
+        meta = {
+            "mode": self.mode.name,
+            "symbol": self.symbol,
+            "exchange": self.exchange.value if self.exchange else "",
+            "interval": self.interval.value if self.interval else "",
+            "name": self.name,
+            "gateway_name": self.gateway_name,
+            "aware": bool(self.tzinfo),
+        }
+        return meta
+
+    @classmethod
+    def from_meta(cls, meta: dict, columns: Dict[str, np.ndarray]) -> "HistoryArray":
+        """
+        Create array from meta data and columns.
+        """
+        # Data loaded from database is always localized with DB_TZ
+        if meta["aware"]:
+            tzinfo = DB_TZ
+        else:
+            tzinfo = None
+
+        return cls(
+            BacktestingMode[meta["mode"]],
+            columns,
+            symbol=meta["symbol"],
+            exchange=Exchange(meta["exchange"]) if meta["exchange"] else None,
+            interval=Interval(meta["interval"]) if meta["interval"] else None,
+            name=meta["name"],
+            gateway_name=meta["gateway_name"],
+            tzinfo=tzinfo
+        )
+
+    def get_fingerprint(self) -> str:
+        """
+        Get hash of meta data and columns, used to identify the same dataset.
+        """
+        if not self.fingerprint:
+            sha = hashlib.sha1()
+            sha.update(json.dumps(self.get_meta(), sort_keys=True).encode())
+
+            for key in sorted(self.columns.keys()):
+                sha.update(key.encode())
+                sha.update(np.ascontiguousarray(self.columns[key]))
+
+            self.fingerprint = sha.hexdigest()
+
+        return self.fingerprint
+
+    def save(self, path: Path) -> None:
+        """
+        Save columns as .npy files and meta data as json into folder.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+
+        for key, array in self.columns.items():
+            np.save(path.joinpath(f"{key}.npy"), array)
+
+        with open(path.joinpath("meta.json"), mode="w+", encoding="UTF-8") as f:
+            json.dump(self.get_meta(), f, indent=4, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "HistoryArray":
+        """
+        Load array saved in folder, with columns memory-mapped by default.
+        """
+        with open(path.joinpath("meta.json"), mode="r", encoding="UTF-8") as f:
+            meta = json.load(f)
+
+        mode = BacktestingMode[meta["mode"]]
+        mmap_mode = "r" if mmap else None
+
+        columns = {}
+        for key in ["datetime"] + MODE_FIELDS_MAP[mode]:
+            columns[key] = np.load(path.joinpath(f"{key}.npy"), mmap_mode=mmap_mode)
+
+        return cls.from_meta(meta, columns)
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.datetime_array)
+
+    def __getitem__(self, ix):
+        """
+        Index returns BarData/TickData, slice returns a view.
+        """
+        if isinstance(ix, slice):
+            columns = {k: v[ix] for k, v in self.columns.items()}
+            return self.new(columns)
+
+        if ix < 0:
+            ix += len(self)
+
+        kwargs = {k: float(v[ix]) for k, v in self.columns.items() if k != "datetime"}
+
+        if self.mode == BacktestingMode.BAR:
+            return BarData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=self.get_datetime(ix),
+                interval=self.interval,
+                gateway_name=self.gateway_name,
+                **kwargs
+            )
+        else:
+            return TickData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=self.get_datetime(ix),
+                name=self.name,
+                gateway_name=self.gateway_name,
+                **kwargs
+            )
+
+    def __iter__(self):
+        """"""
+        for ix in range(len(self)):
+            yield self[ix]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Total memory used by the columns.
+        """
+        return sum(v.nbytes for v in self.columns.values())
+
+
+class HistoryCache:
+    """
+    On-disk cache of history data for one contract and interval.
+
+    Each entry is a folder of memory-mappable .npy columns whose name
+    records the time range it covers. Entries of disjoint time ranges
+    are kept at the same time.
+    """
+
+    folder_name = "cta_history_cache"
+
+    def __init__(
+        self,
+        mode: BacktestingMode,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval
+    ):
+        """"""
+        if mode == BacktestingMode.BAR:
+            self.key = f"{symbol}.{exchange.value}_{interval.value}"
+            self.interval_delta = INTERVAL_DELTA_MAP.get(interval, MICROSECOND)
+        else:
+            self.key = f"{symbol}.{exchange.value}_tick"
+            self.interval_delta = MICROSECOND
+
+        self.cache_path = get_folder_path(self.folder_name)
+
+    def get_entries(self) -> List[Tuple[datetime, datetime, Path]]:
+        """
+        Get time range and path of all cached entries, sorted by start.
+        """
+        entries = []
+
+        for path in self.cache_path.glob(f"{self.key}_*"):
+            if not path.joinpath("meta.json").exists():
+                continue
+
+            start_str, end_str = path.name[len(self.key) + 1:].split("_")
+            start = datetime.strptime(start_str, "%Y%m%d%H%M%S%f").replace(tzinfo=timezone.utc)
+            end = datetime.strptime(end_str, "%Y%m%d%H%M%S%f").replace(tzinfo=timezone.utc)
+            entries.append((start, end, path))
+
+        entries.sort()
+        return entries
+
+    def get_overlapped_entries(
+        self,
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[datetime, datetime, Path]]:
+        """
+        Get cached entries overlapped with [start, end], sorted by start.
+        """
+        start = to_utc(start)
+        end = to_utc(end)
+
+        return [
+            (entry_start, entry_end, path)
+            for entry_start, entry_end, path in self.get_entries()
+            if entry_start <= end and entry_end >= start
+        ]
+
+    def load(self, start: datetime, end: datetime) -> Optional[HistoryArray]:
+        """
+        Load data of [start, end] if fully covered by a cached entry.
+        """
+        start = to_utc(start)
+        end = to_utc(end)
+
+        for entry_start, entry_end, path in self.get_entries():
+            if entry_start <= start and entry_end >= end:
+                array = HistoryArray.load(path)
+                return array.between(start, end)
+
+        return None
+
+    def save(self, array: HistoryArray, start: datetime, end: datetime) -> None:
+        """
+        Save data loaded for [start, end], and remove entries covered by it.
+
+        The entry only covers time until the next bar after the last one
+        in data, so that data saved into database later (e.g. when end is
+        in the future) is loaded next time.
+        """
+        if not len(array):
+            return
+
+        start = to_utc(start)
+        end = to_utc(end)
+
+        last = to_utc(array.get_datetime(-1))
+        entry_end = min(end, last + self.interval_delta - MICROSECOND)
+
+        old_entries = self.get_entries()
+
+        name = f"{self.key}_{start:%Y%m%d%H%M%S%f}_{entry_end:%Y%m%d%H%M%S%f}"
+        path = self.cache_path.joinpath(name)
+
+        # Write into temp folder first so that readers never see partial data
+        temp_path = self.cache_path.joinpath(f"temp_{uuid4().hex}")
+        array.save(temp_path)
+
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        # Old entries may still be mapped by other process, ignore errors
+        for old_start, old_end, old_path in old_entries:
+            if old_path != path and old_start >= start and old_end <= end:
+                shutil.rmtree(old_path, ignore_errors=True)
+
+
+class SharedHistory:
+    """
+    Publish columns of history array in one shared memory block, so that
+    optimization worker processes can attach to it without loading data.
+    """
+
+    def __init__(self, array: HistoryArray):
+        """"""
+        size = max(array.nbytes, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        layout = []
+        offset = 0
+
+        for key, column in array.columns.items():
+            buf = np.ndarray(column.shape, column.dtype, self.shm.buf, offset)
+            buf[:] = column
+
+            layout.append((key, column.dtype.str, len(column), offset))
+            offset += column.nbytes
+
+        # Picklable info passed to worker processes
+        self.info = {
+            "name": self.shm.name,
+            "layout": layout,
+            "meta": array.get_meta(),
+        }
+
+    def close(self) -> None:
+        """
+        Release shared memory block after optimization finished.
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+
+attached_shms: Dict[str, "shared_memory.SharedMemory"] = {}
+
+
+def attach_shared_history(info: dict) -> HistoryArray:
+    """
+    Create history array from shared memory published by SharedHistory.
+    """
+    name = info["name"]
+
+    # Keep shared memory attached for the lifetime of worker process
+    shm = attached_shms.get(name, None)
+    if not shm:
+        shm = shared_memory.SharedMemory(name=name)
+        attached_shms[name] = shm
+
+    columns = {}
+    for key, dtype, length, offset in info["layout"]:
+        column = np.ndarray((length,), dtype, shm.buf, offset)
+        column.flags.writeable = False
+        columns[key] = column
+
+    return HistoryArray.from_meta(info["meta"], columns)
+
+
+ARRAY_FIELDS = [
+    ("open_array", "open_price"),
+    ("high_array", "high_price"),
+    ("low_array", "low_price"),
+    ("close_array", "close_price"),
+    ("volume_array", "volume"),
+    ("turnover_array", "turnover"),
+    ("open_interest_array", "open_interest"),
+]
+
+
+def update_array_manager(am: ArrayManager, history: HistoryArray) -> None:
+    """
+    Update all bars in history into ArrayManager at once, with the same
+    result as calling update_bar one by one.
+    """
+    count = len(history)
+    if not count:
+        return
+
+    am.count += count
+    if not am.inited and am.count >= am.size:
+        am.inited = True
+
+    n = min(count, am.size)
+
+    for array_name, field in ARRAY_FIELDS:
+        array = getattr(am, array_name)
+        array[:-n] = array[n:]
+        array[-n:] = history.columns[field][-n:]
+
+
+def to_utc(dt: datetime) -> datetime:
+    """
+    Convert datetime into UTC, naive datetime is treated as DB_TZ time.
+    """
+    if not dt.tzinfo:
+        dt = DB_TZ.localize(dt)
+
+    return dt.astimezone(timezone.utc)
+
+
+def from_utc(dt: datetime, tzinfo=None) -> datetime:
+    """
+    Convert UTC datetime into tzinfo, or naive DB_TZ time if tzinfo is None.
+    """
+    if tzinfo:
+        return dt.astimezone(tzinfo)
+
+    return dt.astimezone(DB_TZ).replace(tzinfo=None)
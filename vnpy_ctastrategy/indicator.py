@@ -0,0 +1,280 @@
+"""
+Memoization of indicator series calculated in precompute backtesting mode.
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Optional, Union
+from uuid import uuid4
+
+import numpy as np
+
+from vnpy.trader.utility import ArrayManager
+
+from .base import BacktestingMode
+from .history import HistoryArray
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator arrays within a memory budget.
+
+    If path is given, calculated arrays are also saved into the folder as
+    .npy files, so that other processes (e.g. optimization workers) can
+    memory-map them instead of calculating again.
+    """
+
+    folder_name = "cta_indicator_cache"
+
+    def __init__(self, budget: int = 256 * 1024 * 1024, path: str = ""):
+        """"""
+        self.budget: int = budget
+        self.path: Optional[Path] = Path(path) if path else None
+
+        self.values: OrderedDict = OrderedDict()
+        self.nbytes: int = 0
+
+    def get(self, key: str) -> Union[np.ndarray, tuple, None]:
+        """
+        Get cached value from memory first, and then from shared folder.
+        """
+        value = self.values.get(key, None)
+        if value is not None:
+            self.values.move_to_end(key)
+            return value
+
+        if self.path:
+            value = self.load(key)
+            if value is not None:
+                self.remember(key, value)
+
+        return value
+
+    def set(self, key: str, value: Union[np.ndarray, tuple]) -> None:
+        """
+        Cache an array or tuple of arrays.
+        """
+        # Cached arrays are shared by all strategies, avoid modification
+        for array in get_arrays(value):
+            array.flags.writeable = False
+
+        self.remember(key, value)
+
+        if self.path:
+            self.save(key, value)
+
+    def remember(self, key: str, value: Union[np.ndarray, tuple]) -> None:
+        """
+        Keep value in memory and evict least recently used ones over budget.
+        """
+        nbytes = sum(array.nbytes for array in get_arrays(value))
+        if nbytes > self.budget:
+            return
+
+        old_value = self.values.pop(key, None)
+        if old_value is not None:
+            self.nbytes -= sum(array.nbytes for array in get_arrays(old_value))
+
+        self.values[key] = value
+        self.nbytes += nbytes
+
+        while self.nbytes > self.budget:
+            _, old_value = self.values.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in get_arrays(old_value))
+
+    def load(self, key: str) -> Union[np.ndarray, tuple, None]:
+        """
+        Load value saved by any process, with arrays memory-mapped.
+        """
+        path = self.path.joinpath(key)
+        if not path.exists():
+            return None
+
+        single_path = path.joinpath("value.npy")
+        if single_path.exists():
+            return np.load(single_path, mmap_mode="r")
+
+        count = len(list(path.glob("*.npy")))
+        return tuple(np.load(path.joinpath(f"{n}.npy"), mmap_mode="r") for n in range(count))
+
+    def save(self, key: str, value: Union[np.ndarray, tuple]) -> None:
+        """
+        Save value into shared folder.
+        """
+        path = self.path.joinpath(key)
+        if path.exists():
+            return
+
+        # Write into temp folder first so that readers never see partial data
+        temp_path = self.path.joinpath(f"temp_{uuid4().hex}")
+        temp_path.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(value, tuple):
+            for n, array in enumerate(value):
+                np.save(temp_path.joinpath(f"{n}.npy"), array)
+        else:
+            np.save(temp_path.joinpath("value.npy"), value)
+
+        # Same value may have been saved by another process
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def clear(self) -> None:
+        """"""
+        self.values.clear()
+        self.nbytes = 0
+
+
+indicator_cache: IndicatorCache = IndicatorCache()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """
+    Get indicator cache of current process.
+    """
+    return indicator_cache
+
+
+def set_indicator_path(path: str) -> None:
+    """
+    Share indicator cache of current process through folder, called in
+    optimization worker processes.
+    """
+    global indicator_cache
+
+    if path != (str(indicator_cache.path) if indicator_cache.path else ""):
+        indicator_cache = IndicatorCache(indicator_cache.budget, path)
+
+
+def get_arrays(value: Union[np.ndarray, tuple]) -> tuple:
+    """"""
+    if isinstance(value, tuple):
+        return value
+    return (value,)
+
+
+def get_indicator_key(fingerprint: str, name: str, arguments: dict) -> str:
+    """
+    Generate cache key by data fingerprint, indicator name and parameters.
+    """
+    text = f"{fingerprint}|{name}|{sorted(arguments.items())}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class HistoryArrayManager:
+    """
+    ArrayManager indicator API over full history data, used in
+    calculate_indicators.
+
+    Indicator functions calculate series of the whole history, and results
+    are memoized in indicator cache by data fingerprint and parameters, so
+    that optimization runs with the same indicator parameters only
+    calculate them once.
+    """
+
+    def __init__(self, history: HistoryArray, cache: IndicatorCache = None):
+        """"""
+        columns = history.columns
+
+        # Indicators are calculated by ArrayManager holding full history
+        am = ArrayManager(size=1)
+        am.count = len(history)
+        am.size = len(history)
+        am.inited = True
+
+        if history.mode == BacktestingMode.BAR:
+            am.close_array = columns["close_price"]
+        else:
+            am.close_array = columns["last_price"]
+
+        am.open_array = columns["open_price"]
+        am.high_array = columns["high_price"]
+        am.low_array = columns["low_price"]
+        am.volume_array = columns["volume"]
+        am.turnover_array = columns["turnover"]
+        am.open_interest_array = columns["open_interest"]
+
+        self.am: ArrayManager = am
+        self.cache: Optional[IndicatorCache] = cache
+        self.fingerprint: str = history.get_fingerprint()
+
+    @property
+    def open(self) -> np.ndarray:
+        """"""
+        return self.am.open
+
+    @property
+    def high(self) -> np.ndarray:
+        """"""
+        return self.am.high
+
+    @property
+    def low(self) -> np.ndarray:
+        """"""
+        return self.am.low
+
+    @property
+    def close(self) -> np.ndarray:
+        """"""
+        return self.am.close
+
+    @property
+    def volume(self) -> np.ndarray:
+        """"""
+        return self.am.volume
+
+    @property
+    def turnover(self) -> np.ndarray:
+        """"""
+        return self.am.turnover
+
+    @property
+    def open_interest(self) -> np.ndarray:
+        """"""
+        return self.am.open_interest
+
+
+def memoize_indicator(name: str, func: Callable) -> Callable:
+    """
+    Wrap ArrayManager indicator function with indicator cache.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(self: HistoryArrayManager, *args, **kwargs):
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+
+        arguments = dict(arguments.arguments)
+        arguments.pop("self")
+        array = arguments.pop("array")
+
+        cache = self.cache or get_indicator_cache()
+        key = get_indicator_key(self.fingerprint, name, arguments)
+
+        value = cache.get(key)
+        if value is None:
+            value = func(self.am, array=True, **arguments)
+            cache.set(key, value)
+
+        if array:
+            return value
+        elif isinstance(value, tuple):
+            return tuple(v[-1] for v in value)
+        else:
+            return value[-1]
+
+    return wrapper
+
+
+for name, func in inspect.getmembers(ArrayManager, inspect.isfunction):
+    if name in {"__init__", "update_bar"}:
+        continue
+    setattr(HistoryArrayManager, name, memoize_indicator(name, func))
@@ -0,0 +1,126 @@
+"""
+Utilities for speeding up strategy parameter optimization.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import importlib_metadata
+import vnpy
+from vnpy.trader.utility import get_folder_path
+
+from .template import CtaTemplate
+
+
+class ResultCache:
+    """
+    Persistent cache of backtesting statistics for each strategy setting.
+
+    Results of one strategy class, dataset and engine parameters are saved
+    into one folder, a file for each setting. The cache is kept across
+    optimization sessions, so only new settings are backtested when
+    optimization is run again.
+    """
+
+    folder_name = "cta_optimization_cache"
+
+    def __init__(self, key: str):
+        """"""
+        self.key: str = key
+        self.path: Path = get_folder_path(self.folder_name).joinpath(key)
+
+    def load(self, setting: dict) -> Optional[dict]:
+        """
+        Load statistics of setting, return None if not found.
+        """
+        filepath = self.path.joinpath(f"{get_setting_key(setting)}.pkl")
+        if not filepath.exists():
+            return None
+
+        try:
+            with open(filepath, mode="rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def save(self, setting: dict, statistics: dict) -> None:
+        """
+        Save statistics of setting with an atomic file replace.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        filepath = self.path.joinpath(f"{get_setting_key(setting)}.pkl")
+        temp_path = self.path.joinpath(f"temp_{uuid4().hex}")
+
+        with open(temp_path, mode="wb") as f:
+            pickle.dump(statistics, f)
+
+        os.replace(temp_path, filepath)
+
+
+def get_setting_key(setting: dict) -> str:
+    """"""
+    text = str(sorted(setting.items()))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def get_class_hash(strategy_class: type, engine_class: type) -> str:
+    """
+    Get hash of source files used by strategy and backtesting engine.
+
+    The whole module of each class in MRO is hashed, so that helper classes
+    and functions defined beside them are also covered. Versions of vnpy
+    and this app are included for code outside these modules.
+
+    Return empty string if source code is not available.
+    """
+    sha = hashlib.sha1()
+    sha.update(f"{vnpy.__version__}|{get_app_version()}".encode())
+
+    # Parent classes of CtaTemplate (e.g. ABC) are not included
+    classes = []
+    for cls in strategy_class.__mro__:
+        classes.append(cls)
+        if cls is CtaTemplate:
+            break
+    classes.append(engine_class)
+
+    module_names = []
+    for cls in classes:
+        if cls.__module__ not in module_names:
+            module_names.append(cls.__module__)
+
+    for module_name in module_names:
+        module = sys.modules.get(module_name, None)
+
+        try:
+            source = inspect.getsource(module)
+        except (OSError, TypeError):
+            return ""
+
+        sha.update(module_name.encode())
+        sha.update(source.encode())
+
+    return sha.hexdigest()
+
+
+def get_app_version() -> str:
+    """"""
+    try:
+        return importlib_metadata.version("vnpy_ctastrategy")
+    except importlib_metadata.PackageNotFoundError:
+        return "dev"
+
+
+def get_result_key(class_hash: str, fingerprint: str, parameters: list) -> str:
+    """
+    Generate key of result cache by strategy, dataset and engine parameters.
+    """
+    text = f"{class_hash}|{fingerprint}|{parameters}"
+    return hashlib.sha1(text.encode()).hexdigest()
@@ -0,0 +1,226 @@
+"""
+Background persistence of strategy data used in live trading.
+"""
+
+import json
+import os
+import traceback
+from copy import deepcopy
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional
+
+from vnpy.trader.utility import get_file_path
+
+
+class StrategyDataWriter:
+    """
+    Save strategy data into json file in a background thread.
+
+    Changed variables of each strategy are appended into a journal file
+    and fsynced in small batches, so that the event engine thread never
+    waits for disk I/O. The journal is compacted into the json snapshot
+    file once it grows large enough, and on start-up/close.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        interval: float = 0.1,
+        compact_count: int = 1000,
+        write_log: Callable = None
+    ):
+        """"""
+        self.filepath: Path = get_file_path(filename)
+        self.journal_path: Path = self.filepath.with_suffix(".journal")
+        self.interval: float = interval
+        self.compact_count: int = compact_count
+        self.write_log: Callable = write_log
+
+        self.data: dict = {}            # snapshot written by background thread
+        self.last_data: dict = {}       # latest data of each strategy
+        self.dirty: dict = {}           # strategy_name: changed variables
+        self.journal_count: int = 0
+
+        self.lock: Lock = Lock()            # for dirty data
+        self.flush_lock: Lock = Lock()      # for file writing
+        self.stop_event: Event = Event()
+        self.thread: Optional[Thread] = None
+
+    def load(self) -> dict:
+        """
+        Load strategy data by replaying journal on snapshot file.
+        """
+        data = {}
+
+        if self.filepath.exists():
+            with open(self.filepath, mode="r", encoding="UTF-8") as f:
+                data = json.load(f)
+
+        for strategy_name, delta in load_journal(self.journal_path):
+            data.setdefault(strategy_name, {}).update(delta)
+
+        with self.flush_lock:
+            self.data = data
+            self.compact()
+
+        self.last_data = deepcopy(data)
+        return deepcopy(data)
+
+    def start(self) -> None:
+        """
+        Start background thread.
+        """
+        if self.thread:
+            return
+
+        self.stop_event.clear()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def update(self, strategy_name: str, data: dict) -> None:
+        """
+        Record variables of a strategy changed since last update.
+        """
+        with self.lock:
+            last = self.last_data.setdefault(strategy_name, {})
+
+            delta = {}
+            for name, value in data.items():
+                if name not in last or last[name] != value:
+                    # Copy to avoid values changed by strategy while being written
+                    value = deepcopy(value)
+                    delta[name] = value
+                    last[name] = value
+
+            if delta:
+                self.dirty.setdefault(strategy_name, {}).update(delta)
+
+    def flush(self) -> None:
+        """
+        Append pending changes into journal, compact if journal is too long.
+        """
+        with self.lock:
+            dirty = self.dirty
+            self.dirty = {}
+
+        with self.flush_lock:
+            if dirty:
+                try:
+                    self.write_journal(dirty)
+                except Exception:
+                    self.restore_dirty(dirty)
+                    raise
+
+            if self.journal_count >= self.compact_count:
+                self.compact()
+
+    def write_journal(self, dirty: dict) -> None:
+        """
+        Append changes into journal file, must be called with flush_lock.
+        """
+        lines = []
+        for strategy_name, delta in dirty.items():
+            line = json.dumps([strategy_name, delta], ensure_ascii=False)
+            lines.append(line + "\n")
+
+        with open(self.journal_path, mode="a", encoding="UTF-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Snapshot data only includes changes already saved in journal
+        for strategy_name, delta in dirty.items():
+            self.data.setdefault(strategy_name, {}).update(delta)
+
+        self.journal_count += len(lines)
+
+    def restore_dirty(self, dirty: dict) -> None:
+        """
+        Put changes failed to write back, so that they are retried next flush.
+        """
+        with self.lock:
+            for strategy_name, delta in dirty.items():
+                # Changes recorded after this flush started are newer
+                newer = self.dirty.get(strategy_name, {})
+                delta.update(newer)
+                self.dirty[strategy_name] = delta
+
+    def compact(self) -> None:
+        """
+        Write snapshot file and clear journal, must be called with flush_lock.
+        """
+        save_json_atomic(self.filepath, self.data)
+
+        # Journal is only cleared after snapshot is saved, replaying it
+        # again on the new snapshot gives the same result.
+        if self.journal_path.exists():
+            os.remove(self.journal_path)
+
+        self.journal_count = 0
+
+    def run(self) -> None:
+        """"""
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                if self.write_log:
+                    self.write_log(f"策略数据保存失败，触发异常：\n{traceback.format_exc()}")
+
+    def close(self) -> None:
+        """
+        Stop background thread, flush and compact remaining changes.
+        """
+        if not self.thread:
+            return
+
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+        self.flush()
+
+        with self.flush_lock:
+            self.compact()
+
+
+def load_journal(journal_path: Path) -> List[tuple]:
+    """
+    Load (strategy_name, delta) records from journal file.
+
+    A broken last line left by crash during writing is ignored.
+    """
+    records = []
+
+    if not journal_path.exists():
+        return records
+
+    with open(journal_path, mode="r", encoding="UTF-8") as f:
+        for line in f:
+            try:
+                strategy_name, delta = json.loads(line)
+            except ValueError:
+                break
+            records.append((strategy_name, delta))
+
+    return records
+
+
+def save_json_atomic(filepath: Path, data: dict) -> None:
+    """
+    Save data into json file by replacing it with a fully written temp file.
+    """
+    temp_path = filepath.with_name(filepath.name + ".tmp")
+
+    with open(temp_path, mode="w+", encoding="UTF-8") as f:
+        json.dump(
+            data,
+            f,
+            indent=4,
+            ensure_ascii=False
+        )
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, filepath)
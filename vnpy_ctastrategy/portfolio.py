@@ -0,0 +1,255 @@
+"""
+Backtesting of several CTA strategies on different contracts in one pass.
+"""
+
+import traceback
+from datetime import datetime
+from heapq import merge
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+from pandas import DataFrame, concat
+
+from vnpy.trader.constant import Interval
+
+from .backtesting import BacktestingEngine
+from .base import BacktestingMode
+
+
+DAILY_FIELDS = [
+    "turnover",
+    "commission",
+    "slippage",
+    "trade_count",
+    "trading_pnl",
+    "holding_pnl",
+    "total_pnl",
+    "net_pnl",
+]
+
+
+class PortfolioBacktestingEngine:
+    """
+    Replay history data of several contracts in one time ordered stream.
+
+    Each strategy runs in its own BacktestingEngine, which keeps the order
+    books and daily results of the contract. History data of all engines
+    are merged by datetime, and daily results are summed into one portfolio
+    daily DataFrame.
+    """
+
+    def __init__(self):
+        """"""
+        self.start: datetime = None
+        self.end: datetime = None
+        self.capital: int = 1_000_000
+        self.mode: BacktestingMode = BacktestingMode.BAR
+        self.risk_free: float = 0
+        self.annual_days: int = 240
+        self.columnar: bool = False
+        self.use_cache: bool = False
+        self.load_workers: int = 1
+
+        self.engines: List[BacktestingEngine] = []
+        self.daily_df: DataFrame = None
+
+    def set_parameters(
+        self,
+        start: datetime,
+        end: datetime = None,
+        capital: int = 1_000_000,
+        mode: BacktestingMode = BacktestingMode.BAR,
+        risk_free: float = 0,
+        annual_days: int = 240,
+        columnar: bool = False,
+        use_cache: bool = False,
+        load_workers: int = 1
+    ):
+        """"""
+        self.start = start
+        self.end = end
+        self.capital = capital
+        self.mode = mode
+        self.risk_free = risk_free
+        self.annual_days = annual_days
+        self.columnar = columnar
+        self.use_cache = use_cache
+        self.load_workers = load_workers
+
+    def add_strategy(
+        self,
+        strategy_class: type,
+        setting: dict,
+        vt_symbol: str,
+        interval: Interval,
+        rate: float,
+        slippage: float,
+        size: float,
+        pricetick: float,
+        inverse: bool = False
+    ) -> BacktestingEngine:
+        """
+        Add a strategy trading vt_symbol, return its backtesting engine.
+        """
+        engine = BacktestingEngine()
+        engine.output = self.output
+
+        engine.set_parameters(
+            vt_symbol=vt_symbol,
+            interval=interval,
+            start=self.start,
+            rate=rate,
+            slippage=slippage,
+            size=size,
+            pricetick=pricetick,
+            capital=self.capital,
+            end=self.end,
+            mode=self.mode,
+            inverse=inverse,
+            risk_free=self.risk_free,
+            annual_days=self.annual_days,
+            columnar=self.columnar,
+            use_cache=self.use_cache,
+            load_workers=self.load_workers
+        )
+        engine.add_strategy(strategy_class, setting)
+
+        self.engines.append(engine)
+        return engine
+
+    def load_data(self):
+        """
+        Load history data, which is shared by engines of the same contract.
+        """
+        if not self.end:
+            self.end = datetime.now()
+
+        loaded: Dict[Tuple[str, Interval], list] = {}
+
+        for engine in self.engines:
+            engine.end = self.end
+
+            key = (engine.vt_symbol, engine.interval)
+            if key in loaded:
+                engine.history_data = loaded[key]
+                continue
+
+            engine.load_data()
+            loaded[key] = engine.history_data
+
+    def run_backtesting(self):
+        """
+        Initialize all strategies, and then replay their history data
+        merged in datetime order.
+        """
+        engines = []
+        streams = []
+
+        for engine in self.engines:
+            if not engine.history_data:
+                self.output(f"{engine.vt_symbol}历史数据为空，跳过该合约")
+                continue
+
+            result = engine.init_backtesting()
+            if not result:
+                self.output(f"{engine.vt_symbol}策略初始化失败，跳过该合约")
+                continue
+            data_iterator, _ = result
+
+            if self.mode == BacktestingMode.BAR:
+                func = engine.new_bar
+            else:
+                func = engine.new_tick
+
+            engines.append(engine)
+            streams.append(zip(data_iterator, repeat(func), repeat(engine)))
+
+        if not engines:
+            self.output("没有可回放的合约，回测终止")
+            return
+
+        self.output("开始回放组合历史数据")
+
+        # Engine raised exception is stopped, others keep running
+        failed_engines = set()
+
+        # K-way merge, data with the same datetime keeps the engine order
+        for data, func, engine in merge(*streams, key=lambda item: item[0].datetime):
+            if engine in failed_engines:
+                continue
+
+            try:
+                func(data)
+            except Exception:
+                self.output(f"{engine.vt_symbol}触发异常，该合约回测终止")
+                self.output(traceback.format_exc())
+                failed_engines.add(engine)
+
+        for engine in engines:
+            if engine not in failed_engines:
+                engine.strategy.on_stop()
+
+        self.output("组合历史数据回放结束")
+
+    def calculate_result(self) -> Optional[DataFrame]:
+        """
+        Calculate daily result of each engine and sum them by date.
+        """
+        dfs = []
+
+        for engine in self.engines:
+            df = engine.calculate_result()
+            if df is not None:
+                dfs.append(df[DAILY_FIELDS])
+
+        if not dfs:
+            self.output("组合成交记录为空，无法计算")
+            self.daily_df = None
+            return None
+
+        self.daily_df = concat(dfs).groupby(level=0).sum().sort_index()
+        return self.daily_df
+
+    def calculate_statistics(self, df: DataFrame = None, output=True) -> dict:
+        """
+        Calculate statistics of portfolio daily result.
+        """
+        if df is None:
+            df = self.daily_df
+
+        return self.create_summary_engine().calculate_statistics(df, output)
+
+    def show_chart(self, df: DataFrame = None):
+        """"""
+        if df is None:
+            df = self.daily_df
+
+        return self.create_summary_engine().show_chart(df)
+
+    def create_summary_engine(self) -> BacktestingEngine:
+        """
+        Create engine with portfolio capital for statistics and chart.
+        """
+        engine = BacktestingEngine()
+        engine.output = self.output
+        engine.capital = self.capital
+        engine.risk_free = self.risk_free
+        engine.annual_days = self.annual_days
+        return engine
+
+    def get_all_trades(self) -> list:
+        """
+        Get trades of all engines in datetime order.
+        """
+        trades = []
+        for engine in self.engines:
+            trades.extend(engine.get_all_trades())
+
+        trades.sort(key=lambda trade: trade.datetime)
+        return trades
+
+    def output(self, msg):
+        """
+        Output message of backtesting engine.
+        """
+        print(f"{datetime.now()}\t{msg}")
@@ -7,6 +7,8 @@ from vnpy_ctastrategy import (
     OrderData,
     BarGenerator,
     ArrayManager,
+    HistoryArray,
+    HistoryArrayManager,
 )
 
 
@@ -54,6 +56,17 @@ class DoubleMaStrategy(CtaTemplate):
 
         self.put_event()
 
+    def calculate_indicators(self, history: HistoryArray):
+        """
+        Calculate moving averages over full history in precompute mode.
+        """
+        am = HistoryArrayManager(history)
+
+        return {
+            "fast_ma": am.sma(self.fast_window, array=True),
+            "slow_ma": am.sma(self.slow_window, array=True),
+        }
+
     def on_tick(self, tick: TickData):
         """
         Callback of new tick data update.
@@ -70,13 +83,20 @@ class DoubleMaStrategy(CtaTemplate):
         if not am.inited:
             return
 
-        fast_ma = am.sma(self.fast_window, array=True)
-        self.fast_ma0 = fast_ma[-1]
-        self.fast_ma1 = fast_ma[-2]
+        if self.indicators:
+            self.fast_ma0 = self.get_indicator("fast_ma")
+            self.fast_ma1 = self.get_indicator("fast_ma", 1)
+
+            self.slow_ma0 = self.get_indicator("slow_ma")
+            self.slow_ma1 = self.get_indicator("slow_ma", 1)
+        else:
+            fast_ma = am.sma(self.fast_window, array=True)
+            self.fast_ma0 = fast_ma[-1]
+            self.fast_ma1 = fast_ma[-2]
 
-        slow_ma = am.sma(self.slow_window, array=True)
-        self.slow_ma0 = slow_ma[-1]
-        self.slow_ma1 = slow_ma[-2]
+            slow_ma = am.sma(self.slow_window, array=True)
+            self.slow_ma0 = slow_ma[-1]
+            self.slow_ma1 = slow_ma[-2]
 
         cross_over = self.fast_ma0 > self.slow_ma0 and self.fast_ma1 < self.slow_ma1
         cross_below = self.fast_ma0 < self.slow_ma0 and self.fast_ma1 > self.slow_ma1
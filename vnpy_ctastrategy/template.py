@@ -1,13 +1,16 @@
 """"""
 from abc import ABC
 from copy import copy
-from typing import Any, Callable
+from typing import Any, Callable, Dict
+
+import numpy as np
 
 from vnpy.trader.constant import Interval, Direction, Offset
 from vnpy.trader.object import BarData, TickData, OrderData, TradeData
 from vnpy.trader.utility import virtual
 
-from .base import StopOrder, EngineType
+from .base import StopOrder, EngineType, BacktestingMode
+from .history import HistoryArray
 
 
 class CtaTemplate(ABC):
@@ -33,6 +36,10 @@ class CtaTemplate(ABC):
         self.trading = False
         self.pos = 0
 
+        # Used in precompute backtesting mode
+        self.indicators: Dict[str, np.ndarray] = {}
+        self.bar_index: int = 0
+
         # Copy a new variables list here to avoid duplicate insert when multiple
         # strategy instances are created with the same strategy class.
         self.variables = copy(self.variables)
@@ -127,6 +134,43 @@ class CtaTemplate(ABC):
         """
         pass
 
+    @virtual
+    def on_bar_history(self, history: HistoryArray):
+        """
+        Callback of all warm-up bars at once, as columnar arrays.
+
+        If implemented, it is called instead of on_bar for bars loaded by
+        load_bar. Use update_array_manager to seed ArrayManager in one step.
+        """
+        pass
+
+    @virtual
+    def calculate_indicators(self, history: HistoryArray) -> Dict[str, np.ndarray]:
+        """
+        Calculate indicators over full history at once, only called in
+        precompute backtesting mode.
+
+        Return dict of name: array with the same length as history, which
+        can be read by get_indicator during replay.
+        """
+        return {}
+
+    def get_indicator(self, name: str, shift: int = 0) -> float:
+        """
+        Get precomputed indicator value of current bar, or [shift] bars before.
+
+        Return nan if the bar is before the first bar of history data.
+
+        Note that recursive indicators (e.g. EMA/RSI/ATR) calculated over
+        full history are different from ArrayManager, which only uses bars
+        within its size. And bar_index counts every bar replayed, so it is
+        not aligned with window bars generated by BarGenerator.
+        """
+        ix = self.bar_index - shift
+        if ix < 0:
+            return np.nan
+        return self.indicators[name][ix]
+
     @virtual
     def on_trade(self, trade: TradeData):
         """
@@ -306,9 +350,24 @@ class CtaTemplate(ABC):
             use_database
         )
 
+        if self.check_bar_history(callback):
+            if bars:
+                history = HistoryArray.from_data(BacktestingMode.BAR, bars)
+                self.on_bar_history(history)
+            return
+
         for bar in bars:
             callback(bar)
 
+    def check_bar_history(self, callback: Callable) -> bool:
+        """
+        Check whether warm-up bars should be passed to on_bar_history.
+        """
+        return (
+            callback == self.on_bar
+            and type(self).on_bar_history is not CtaTemplate.on_bar_history
+        )
+
     def load_tick(self, days: int):
         """
         Load historical tick data for initializing strategy.
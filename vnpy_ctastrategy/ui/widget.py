@@ -12,7 +12,8 @@ from ..base import (
     APP_NAME,
     EVENT_CTA_LOG,
     EVENT_CTA_STOPORDER,
-    EVENT_CTA_STRATEGY
+    EVENT_CTA_STRATEGY,
+    EVENT_CTA_STRATEGY_CHANGE
 )
 from ..engine import CtaEngine
 from .rollover import RolloverTool
@@ -23,6 +24,7 @@ class CtaManager(QtWidgets.QWidget):
 
     signal_log = QtCore.pyqtSignal(Event)
     signal_strategy = QtCore.pyqtSignal(Event)
+    signal_strategy_change = QtCore.pyqtSignal(Event)
 
     def __init__(self, main_engine: MainEngine, event_engine: EventEngine):
         super(CtaManager, self).__init__()
@@ -110,26 +112,38 @@ class CtaManager(QtWidgets.QWidget):
     def register_event(self):
         """"""
         self.signal_strategy.connect(self.process_strategy_event)
+        self.signal_strategy_change.connect(self.process_strategy_change_event)
 
         self.event_engine.register(
             EVENT_CTA_STRATEGY, self.signal_strategy.emit
         )
+        self.event_engine.register(
+            EVENT_CTA_STRATEGY_CHANGE, self.signal_strategy_change.emit
+        )
 
     def process_strategy_event(self, event):
         """
-        Update strategy status onto its monitor.
+        Create monitor for new strategy, existing ones are updated by
+        changed data only.
         """
         data = event.data
         strategy_name = data["strategy_name"]
 
-        if strategy_name in self.managers:
-            manager = self.managers[strategy_name]
-            manager.update_data(data)
-        else:
+        if strategy_name not in self.managers:
             manager = StrategyManager(self, self.cta_engine, data)
             self.scroll_layout.insertWidget(0, manager)
             self.managers[strategy_name] = manager
 
+    def process_strategy_change_event(self, event):
+        """
+        Update changed strategy status onto its monitor.
+        """
+        data = event.data
+        manager = self.managers.get(data["strategy_name"], None)
+
+        if manager:
+            manager.update_data(data)
+
     def remove_strategy(self, strategy_name):
         """"""
         manager = self.managers.pop(strategy_name)
@@ -239,14 +253,17 @@ class StrategyManager(QtWidgets.QFrame):
         self.setLayout(vbox)
 
     def update_data(self, data: dict):
-        """"""
-        self._data = data
+        """
+        Update with changed parameters and variables.
+        """
+        self._data["parameters"].update(data["parameters"])
+        self._data["variables"].update(data["variables"])
 
         self.parameters_monitor.update_data(data["parameters"])
         self.variables_monitor.update_data(data["variables"])
 
         # Update button status
-        variables = data["variables"]
+        variables = self._data["variables"]
         inited = variables["inited"]
         trading = variables["trading"]
 
@@ -335,8 +352,12 @@ class DataMonitor(QtWidgets.QTableWidget):
             self.cells[name] = cell
 
     def update_data(self, data: dict):
-        """"""
+        """
+        Update cells of changed data only.
+        """
         for name, value in data.items():
+            self._data[name] = value
+
             cell = self.cells[name]
             cell.setText(str(value))
 